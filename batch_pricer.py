@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 18:20:36 2026
+
+Headless batch pricing: streams trades from a CSV or Parquet file and
+writes one price per trade to a CSV or Parquet file
+
+    python batch_pricer.py trades.csv prices.csv --workers 4
+
+Each row is a trade: a 'kind' column (option, bond, swap, swaption,
+caplet or floorlet) and any parameter columns of portfolio.FIELDS
+(option rows also take 'opt' & 'type'); empty cells default to the
+module constants. The input is read READ_CHUNK rows at a time and every
+chunk is priced by portfolio.Portfolio on one process pool in
+price-only mode, then appended to the output with a 'price' column:
+memory does not grow with the file and no full lattice is stored or
+printed.
+Parquet files require pyarrow.
+
+@author: charles mégnin
+"""
+import argparse
+import math
+import os
+import sys
+import time
+import pandas as pd
+import portfolio as pf
+
+#### PARAMETERS ####
+READ_CHUNK = 10000 # trades read, priced & written at a time
+#### END PARAMETERS ####
+
+
+def _is_parquet(path):
+    return os.path.splitext(path)[1].lower() in ('.parquet', '.pq')
+
+
+def _parquet():
+    ''' pyarrow modules, imported only for Parquet files '''
+    try:
+        import pyarrow # pylint: disable=import-outside-toplevel
+        import pyarrow.parquet # pylint: disable=import-outside-toplevel
+    except ImportError as error:
+        raise Exception('Parquet files require pyarrow') from error
+    return pyarrow, pyarrow.parquet
+
+
+def read_chunks(path, chunk_size=READ_CHUNK):
+    ''' yields DataFrames of at most chunk_size trades '''
+    if _is_parquet(path):
+        _, parquet = _parquet()
+        for batch in parquet.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+
+class ChunkWriter():
+    ''' appends priced chunks to a CSV or Parquet file '''
+
+    def __init__(self, path):
+        self.path   = path
+        self.writer = None # ParquetWriter, opened on the first chunk
+        self.chunks = 0
+
+
+    def write(self, frame):
+        ''' appends one chunk '''
+        if _is_parquet(self.path):
+            pyarrow, parquet = _parquet()
+            if self.writer is None:
+                table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+                self.writer = parquet.ParquetWriter(self.path, table.schema)
+            else:
+                table = pyarrow.Table.from_pandas(frame, schema=self.writer.schema,
+                                                  preserve_index=False)
+            self.writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='w' if self.chunks == 0 else 'a',
+                         header=self.chunks == 0, index=False)
+        self.chunks += 1
+
+
+    def close(self):
+        ''' closes the Parquet file '''
+        if self.writer is not None:
+            self.writer.close()
+
+
+
+def _trades(frame):
+    ''' trade dictionaries of a chunk, empty cells dropped '''
+    return [{key: value for key, value in record.items()
+             if not (isinstance(value, float) and math.isnan(value))}
+            for record in frame.to_dict('records')]
+
+
+def price_file(source, destination, workers=None, chunk_size=READ_CHUNK,
+               shard=pf.CHUNK, verbose=True):
+    ''' prices every trade of source into destination; returns (trades, seconds) '''
+    # pylint: disable=too-many-arguments
+    start  = time.perf_counter()
+    trades = 0
+    writer = ChunkWriter(destination)
+    pool   = None if workers == 0 else pf.worker_pool(workers)
+    try:
+        for frame in read_chunks(source, chunk_size):
+            prices = pf.Portfolio(_trades(frame)).price(workers, shard, pool)
+            writer.write(frame.assign(price=prices))
+            trades += len(frame)
+            if verbose:
+                elapsed = time.perf_counter() - start
+                print(f'{trades} trades, {trades/elapsed:.0f} trades/sec', file=sys.stderr)
+    finally:
+        writer.close()
+        if pool is not None:
+            pool.shutdown()
+    return trades, time.perf_counter() - start
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Prices a CSV/Parquet file of trades')
+    parser.add_argument('source', help='trades (.csv or .parquet)')
+    parser.add_argument('destination', help='prices (.csv or .parquet)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes (default: every core, 0: in-process)')
+    parser.add_argument('--chunk-size', type=int, default=READ_CHUNK,
+                        help='trades read & written at a time')
+    parser.add_argument('--shard', type=int, default=pf.CHUNK,
+                        help='trades per task sent to a worker')
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args()
+
+    count, seconds = price_file(args.source, args.destination, args.workers,
+                                args.chunk_size, args.shard, not args.quiet)
+    print(f'Priced {count} trades in {seconds:.2f} s: {count/seconds:.0f} trades/sec',
+          file=sys.stderr)
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 17:02:45 2026
+
+Benchmarks of every lattice builder across lattice sizes
+
+Each case constructs & builds one lattice at N periods and records the
+best wall time over REPEAT runs and the peak memory traced by
+tracemalloc over a separate run. Cases run in two modes:
+    full : every lattice stores its nodes (N <= FULL_NPER_MAX)
+    price: price-only derivatives on lazy underlyings
+The value read from each lattice is checked against a reference that
+does not come from the same backward pass: Black-Scholes-Merton for
+european options, forward induction of elementary prices for the
+fixed-income lattices, closed forms for Shares, ShortRate & Futures.
+
+Results are written as JSON; --compare prints the time & memory ratios
+against the JSON of another commit.
+    python benchmarks.py --sizes 10 100 1000 --output new.json --compare old.json
+
+@author: charles mégnin
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+import lattice as lt
+import options as op
+import bonds as bd
+import short_rate as sr
+import term_structure as ts
+import black_scholes as bs
+
+#### PARAMETERS ####
+SIZES         = [10, 100, 1000, 10000] # lattice periods N
+REPEAT        = 3 # timed runs per case, the best is kept
+FULL_NPER_MAX = 2000 # largest N built with stored nodes
+OUTPUT        = 'benchmarks.json'
+
+# Term structure of the fixed-income cases, per-period rates over HORIZON years
+BENCH_RATE     = .05 # annual short rate
+BENCH_RATE_VOL = .2 # lognormal short-rate volatility: u = exp(vol*sqrt(dt)), d = 1/u
+BENCH_HORIZON  = 10 # years
+
+# Tolerances on |value - reference|
+EXACT_TOL       = 1e-8 # relative, for references exact on the lattice
+CONVERGENCE_TOL = .05 # times S0/N, for lattice vs continuous-time prices
+REF_NPER        = 20000 # periods of the american reference price
+#### END PARAMETERS ####
+
+_AMERICAN_REFERENCE = {} # nperiods -> reference price, computed once
+
+
+def _term_structure(nperiods):
+    ''' benchmark short-rate parameters with per-period rates for N periods '''
+    d_time = BENCH_HORIZON / nperiods
+    u_rate = math.exp(BENCH_RATE_VOL * math.sqrt(d_time))
+    return sr.TermStructureParameters(BENCH_RATE * d_time, [u_rate, 1./u_rate], [.5, .5],
+                                      nperiods)
+
+
+def _state_prices(ts_par, sh_rate, nperiods, discount=True):
+    ''' yields the elementary prices (discount=True) or the risk-neutral
+        probabilities of the states at t=0..nperiods by forward induction,
+        keeping a single time slice in memory '''
+    prices = np.ones(1)
+    yield prices
+    for period in range(nperiods):
+        rates  = sh_rate.time_slice(period) if discount else np.zeros(period+1)
+        prices = lt.Lattice._forward_prop_slice(prices, rates, ts_par.rnp) # pylint: disable=protected-access
+        yield prices
+
+
+def _expectation(ts_par, sh_rate, nperiods, payoff, discount=True):
+    ''' (discounted) expectation of the payoff vector at t=nperiods '''
+    for prices in _state_prices(ts_par, sh_rate, nperiods, discount):
+        pass
+    return float(prices @ payoff)
+
+
+def _exact(reference, scale=1.):
+    ''' tolerance of a reference exact on the lattice, relative to
+        max(|reference|, scale) so that values near zero are not over-constrained '''
+    return EXACT_TOL * max(abs(reference), scale)
+
+
+def _keep(full, keep=1):
+    ''' keep argument of the derivative lattices of a mode '''
+    return None if full else keep
+
+
+def _evaluate_slices(lattice):
+    ''' a lazy lattice computes nothing when built: evaluate every time
+        slice (one at a time, as a pricer would) so the case times real work '''
+    if lattice.lazy:
+        for period in range(lattice.size+1):
+            lattice.time_slice(period)
+    return lattice
+
+
+#### CASES ####
+# each case returns (run, value, reference, tolerance):
+# run() constructs & builds the benchmarked lattice and returns it,
+# value(lattice) is checked against reference within tolerance
+def _shares(nperiods, full):
+    sec_par = op.SecurityParameters(nperiods=nperiods)
+
+    def run():
+        shares = op.Shares(sec_par, lazy=not full)
+        shares.build()
+        return _evaluate_slices(shares)
+    # top node S0*u^N
+    reference = sec_par.init * math.exp(sec_par.volat * math.sqrt(sec_par.matur * nperiods))
+    return run, lambda shares: shares.time_slice(nperiods)[-1], reference, _exact(reference)
+
+
+def _futures(nperiods, full):
+    sec_par = op.SecurityParameters(nperiods=nperiods)
+    shares  = op.Shares(sec_par, lazy=not full)
+    shares.build()
+
+    def run():
+        futures = op.Futures(sec_par, _keep(full))
+        futures.build(shares)
+        return futures
+    # F0 = S0*exp((r-d)T)
+    reference = sec_par.init * math.exp((sec_par.rate - sec_par.dividend) * sec_par.matur)
+    return run, lambda futures: futures.present_value(), reference, _exact(reference)
+
+
+def _american_reference(sec_par):
+    ''' control-variate american price at REF_NPER periods '''
+    if REF_NPER not in _AMERICAN_REFERENCE:
+        ref_par = op.SecurityParameters(sec_par.init, sec_par.matur, sec_par.volat, REF_NPER,
+                                        sec_par.rate, sec_par.dividend)
+        shares  = op.Shares(ref_par, lazy=True)
+        control = bs.ControlVariate(op.OptionParameters(op.OPT, 'american', op.K, REF_NPER))
+        _AMERICAN_REFERENCE[REF_NPER] = float(control.build(shares, ref_par))
+    return _AMERICAN_REFERENCE[REF_NPER]
+
+
+def _options(nperiods, full, option_type):
+    sec_par = op.SecurityParameters(nperiods=nperiods)
+    opt_par = op.OptionParameters(op.OPT, option_type, op.K, nperiods)
+    shares  = op.Shares(sec_par, lazy=not full)
+    shares.build()
+
+    def run():
+        options = op.Options(opt_par, _keep(full))
+        options.build(shares, sec_par)
+        return options
+    if option_type == 'european':
+        reference = float(bs.BlackScholes(sec_par, opt_par).build())
+    else:
+        reference = _american_reference(sec_par)
+    tolerance = CONVERGENCE_TOL * sec_par.init / nperiods
+    return run, lambda options: options.present_value(), reference, tolerance
+
+
+def _short_rate(nperiods, full):
+    ts_par = _term_structure(nperiods)
+    # top node r0*u^N
+    reference = ts_par.init * math.exp(BENCH_RATE_VOL * math.sqrt(BENCH_HORIZON * nperiods))
+    return (lambda: _evaluate_slices(sr.ShortRate(ts_par, lazy=not full)),
+            lambda short_rate: short_rate.time_slice(nperiods)[-1], reference,
+            _exact(reference))
+
+
+def _bond(nperiods, full):
+    ts_par   = _term_structure(nperiods)
+    sh_rate  = sr.ShortRate(ts_par, lazy=not full)
+    bond_par = bd.BondParameters(bd.BOND_FACE, ts_par.init, nperiods)
+
+    def run():
+        bond = bd.Bond(bond_par, _keep(full))
+        bond.build(ts_par, sh_rate)
+        return bond
+    cash_flows = ts.ElementaryPrices.bond_cash_flows(bond_par.face, bond_par.coupon, nperiods)
+    reference  = sum(prices.sum() * cash_flow for prices, cash_flow
+                     in zip(_state_prices(ts_par, sh_rate, nperiods), cash_flows))
+    return run, lambda bond: bond.present_value(), reference, _exact(reference)
+
+
+def _bond_ff(nperiods, full):
+    ts_par  = _term_structure(nperiods)
+    sh_rate = sr.ShortRate(ts_par, lazy=not full)
+    expiry  = nperiods // 2
+    bond    = bd.Bond(bd.BondParameters(bd.BOND_FACE, ts_par.init, nperiods),
+                      _keep(full, expiry+1))
+    bond.build(ts_par, sh_rate)
+    ff_par  = bd.BondFFParameters(bd.FF_TYPE, ts_par.init, expiry)
+
+    def run():
+        bond_ff = bd.BondFF(ff_par, _keep(full))
+        bond_ff.build(ts_par, sh_rate, bond)
+        return bond_ff
+    payoff    = bond.time_slice(expiry) - 100 * ff_par.coupon
+    reference = _expectation(ts_par, sh_rate, expiry, payoff, ff_par.type == 'forward')
+    return run, lambda bond_ff: bond_ff.present_value(), reference, _exact(reference)
+
+
+def _swap(nperiods, full):
+    ts_par   = _term_structure(nperiods)
+    sh_rate  = sr.ShortRate(ts_par, lazy=not full)
+    swap_par = ts.SwapParameters(nperiods, ts_par.init)
+
+    def run():
+        swap = ts.Swap(swap_par, _keep(full))
+        swap.build(ts_par, sh_rate)
+        return swap
+    # (r_t - K) / (1 + r_t) paid at t=0..N-1
+    reference = 0.
+    for period, prices in enumerate(_state_prices(ts_par, sh_rate, nperiods-1)):
+        rates      = sh_rate.time_slice(period)
+        reference += prices @ ((rates - swap_par.rate) / (1. + rates))
+    return run, lambda swap: swap.present_value(), reference, _exact(reference)
+
+
+def _swaption(nperiods, full):
+    ts_par  = _term_structure(nperiods)
+    sh_rate = sr.ShortRate(ts_par, lazy=not full)
+    expiry  = nperiods // 2
+    swap    = ts.Swap(ts.SwapParameters(nperiods, ts_par.init), _keep(full, expiry+1))
+    swap.build(ts_par, sh_rate)
+    swaption_par = ts.SwaptionParameters(expiry, 0.)
+
+    def run():
+        swaption = ts.Swaption(swaption_par, _keep(full))
+        swaption.build(ts_par, sh_rate, swap)
+        return swaption
+    payoff    = np.maximum(swap.time_slice(expiry), 0.)
+    reference = _expectation(ts_par, sh_rate, expiry, payoff)
+    return run, lambda swaption: swaption.present_value(), reference, _exact(reference)
+
+
+def _capfloorlet(nperiods, full):
+    ts_par  = _term_structure(nperiods)
+    sh_rate = sr.ShortRate(ts_par, lazy=not full)
+    cf_par  = ts.CFParameters('caplet', nperiods, ts_par.init)
+
+    def run():
+        caplet = ts.CapFloorLet(cf_par, _keep(full))
+        caplet.build(ts_par, sh_rate)
+        return caplet
+    # (r - K) / (1 + r) paid in arrears of t=N-1
+    rates     = sh_rate.time_slice(nperiods-1)
+    payoff    = (rates - cf_par.rate) / (1. + rates)
+    reference = _expectation(ts_par, sh_rate, nperiods-1, payoff)
+    return run, lambda caplet: caplet.present_value(), reference, _exact(reference)
+
+
+def _capfloor(nperiods, full):
+    ts_par  = _term_structure(nperiods)
+    sh_rate = sr.ShortRate(ts_par, lazy=not full)
+    cap_par = ts.CapFloorParameters('cap', nperiods, ts_par.init)
+
+    def run(): # prices only, whatever the mode
+        cap = ts.CapFloor(cap_par)
+        cap.build(ts_par, sh_rate)
+        return cap
+    # sum of max(r - K, 0) / (1 + r) paid in arrears of t=0..N-1
+    reference = 0.
+    for period, prices in enumerate(_state_prices(ts_par, sh_rate, nperiods-1)):
+        rates      = sh_rate.time_slice(period)
+        reference += float(prices @ (np.maximum(rates - cap_par.strike[0], 0.) / (1. + rates)))
+    return run, lambda cap: cap.prices[0], reference, _exact(reference)
+
+
+def _elementary(nperiods, full):
+    ts_par   = _term_structure(nperiods)
+    sh_rate  = sr.ShortRate(ts_par, lazy=not full)
+    elem_par = ts.ElementaryPriceParameters(nperiods, ts.ELEM_BASE_PRICE)
+
+    def run(): # always stores its nodes
+        elementary = ts.ElementaryPrices(elem_par)
+        elementary.build(ts_par, sh_rate)
+        return elementary
+    # unit zero-coupon bond maturing at N by backward induction
+    zcb = bd.Bond(bd.BondParameters(1., 0., nperiods), keep=1)
+    zcb.build(ts_par, sh_rate)
+    reference = zcb.present_value()
+    return (run, lambda elementary: elementary.zcb_prices()[nperiods], reference,
+            _exact(reference))
+
+
+CASES = {'Shares.build':              _shares,
+         'Futures.build':             _futures,
+         'Options.build european':    lambda n, full: _options(n, full, 'european'),
+         'Options.build american':    lambda n, full: _options(n, full, 'american'),
+         'ShortRate._build':          _short_rate,
+         'Bond.build':                _bond,
+         'BondFF.build':              _bond_ff,
+         'Swap.build':                _swap,
+         'Swaption.build':            _swaption,
+         'CapFloorLet.build':         _capfloorlet,
+         'CapFloor.build':            _capfloor,
+         'ElementaryPrices.build':    _elementary}
+
+
+#### HARNESS ####
+def measure(case, nperiods, full, repeat=REPEAT):
+    ''' times & traces one case; returns a result dictionary '''
+    run, value, reference, tolerance = CASES[case](nperiods, full)
+    seconds = math.inf
+    for _ in range(repeat):
+        start   = time.perf_counter()
+        built   = run()
+        seconds = min(seconds, time.perf_counter() - start)
+    del built
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    built = run()
+    peak  = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result = float(value(built))
+    error  = abs(result - reference)
+    return {'case': case, 'mode': 'full' if full else 'price', 'nperiods': nperiods,
+            'seconds': seconds, 'peak_bytes': peak, 'value': result,
+            'reference': float(reference), 'error': error, 'tolerance': float(tolerance),
+            'ok': bool(error <= tolerance)}
+
+
+def _commit():
+    ''' current git commit of the repository, if any '''
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes=None, cases=None, repeat=REPEAT, verbose=True):
+    ''' runs the cases at every size in both modes; returns the JSON document '''
+    sizes  = SIZES if sizes is None else sizes
+    cases  = list(CASES) if cases is None else cases
+    results = []
+    for nperiods in sizes:
+        for full in (True, False):
+            if full and nperiods > FULL_NPER_MAX:
+                continue
+            for case in cases:
+                result = measure(case, nperiods, full, repeat)
+                results.append(result)
+                if verbose:
+                    print(f"{case:24s} {result['mode']:5s} N={nperiods:<6d} "
+                          f"{1e3*result['seconds']:10.3f} ms {result['peak_bytes']/2**20:9.2f} MiB "
+                          f"error={result['error']:.2e} {'ok' if result['ok'] else 'FAIL'}")
+    return {'commit': _commit(), 'python': platform.python_version(),
+            'numpy': np.__version__, 'platform': platform.platform(),
+            'repeat': repeat, 'results': results}
+
+
+def compare(new, old):
+    ''' prints the time & peak memory ratios new/old of the common results '''
+    old_results = {(res['case'], res['mode'], res['nperiods']): res for res in old['results']}
+    print(f"\n*** {new['commit']} vs {old['commit']} (new/old) ***")
+    for res in new['results']:
+        key = (res['case'], res['mode'], res['nperiods'])
+        if key in old_results:
+            ref = old_results[key]
+            print(f"{res['case']:24s} {res['mode']:5s} N={res['nperiods']:<6d} "
+                  f"time x{res['seconds']/ref['seconds']:7.3f} "
+                  f"memory x{res['peak_bytes']/max(ref['peak_bytes'], 1):7.3f}")
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks of the lattice builders')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=None)
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--output', default=OUTPUT)
+    parser.add_argument('--compare', default=None, help='JSON results of another commit')
+    args = parser.parse_args()
+
+    document = run_benchmarks(args.sizes, args.cases, args.repeat)
+    with open(args.output, 'w', encoding='utf-8') as output:
+        json.dump(document, output, indent=1)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as previous:
+            compare(document, json.load(previous))
+    if not all(result['ok'] for result in document['results']):
+        sys.exit('Some values are outside their reference tolerance')
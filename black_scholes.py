@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 14:27:03 2026
+
+Closed-form Black-Scholes-Merton prices (continuous dividend yield DIV)
+for european options, and the control-variate correction of american
+lattice prices:
+    C_american ~ C_american(tree) + C_european(BSM) - C_european(tree)
+with both tree prices computed in the same backward pass
+
+@author: charles mégnin
+"""
+import math
+import numpy as np
+import options as op
+
+# standard normal cumulative distribution, elementwise on arrays
+_norm_cdf = np.vectorize(lambda x: .5 * math.erfc(-x / math.sqrt(2.)), otypes=[float])
+
+
+class BlackScholes():
+    ''' Analytic european option prices
+        sec_par: SecurityParameters or SecurityParametersBatch
+        opt_par: OptionParameters or OptionChainParameters
+        expiry (years) = matur * OP_NPER / NPER '''
+
+    def __init__(self, sec_par, opt_par):
+        self.sec_parameters    = sec_par
+        self.option_parameters = opt_par
+        self.prices            = None
+
+
+    def build(self):
+        ''' computes the closed-form prices; returns them '''
+        sec = self.sec_parameters
+        par = self.option_parameters
+        chain  = op.OptionChainParameters(par.opt, 'european', par.strike, par.nperiods)
+        expiry = sec.matur * chain.expiry / sec.nperiods
+        vol_t  = sec.volat * np.sqrt(expiry)
+        fwd    = sec.init * np.exp(-sec.dividend * expiry) # dividend-discounted spot
+        pv_k   = chain.strike * np.exp(-sec.rate * expiry) # discounted strike
+        d_1    = np.log(fwd / pv_k) / vol_t + .5 * vol_t
+        d_2    = d_1 - vol_t
+        flag   = chain.flag
+        prices = flag * (fwd * _norm_cdf(flag * d_1) - pv_k * _norm_cdf(flag * d_2))
+
+        self.prices = prices[0] if np.ndim(par.strike) == 0 and prices.size == 1 else prices
+        return self.prices
+
+
+    def describe(self):
+        '''Self-descriptor'''
+        print('\n*** Black-Scholes-Merton price ***')
+        self.option_parameters.describe()
+        print(f'C0={self.prices:.4f}' if np.ndim(self.prices) == 0 else f'C0={self.prices}')
+
+
+
+class ControlVariate():
+    ''' American option priced on the lattice with its european twin as
+        control variate: both contracts run in one OptionChain pass
+        on the same Shares (or Futures) lattice
+        the analytic twin is Black-Scholes-Merton on shares and Black-76
+        on futures (BSM on F0 with dividend = rate: no carry) '''
+
+    def __init__(self, opt_par):
+        self.option_parameters = opt_par
+        self.tree_american     = None
+        self.tree_european     = None
+        self.analytic_european = None
+        self.price             = None
+
+
+    def build(self, underlying, sec_par):
+        ''' returns the control-variate corrected american price '''
+        par   = self.option_parameters
+        chain = op.OptionChainParameters(par.opt, ['american', 'european'],
+                                         [par.strike, par.strike], par.nperiods)
+        tree  = op.OptionChain(chain).build(underlying, sec_par)
+        self.tree_american, self.tree_european = tree
+        if isinstance(underlying, op.Futures):
+            sec_par = op.SecurityParameters(underlying.present_value(), sec_par.matur,
+                                            sec_par.volat, sec_par.nperiods, sec_par.rate,
+                                            sec_par.rate)
+        self.analytic_european = BlackScholes(sec_par, par).build()
+        self.price = self.tree_american + self.analytic_european - self.tree_european
+        return self.price
+
+
+    def describe(self):
+        '''Self-descriptor'''
+        print('\n*** Control variate american price ***')
+        print(f'Tree american: {self.tree_american:.4f}')
+        print(f'Tree european: {self.tree_european:.4f}')
+        print(f'Analytic european: {self.analytic_european:.4f}')
+        print(f'C0={self.price:.4f}')
+
+
+
+if __name__ == '__main__':
+    security_params = op.SecurityParameters()
+    shares = op.Shares(security_params)
+    shares.build()
+
+    european = BlackScholes(security_params,
+                            op.OptionParameters(op.OPT, 'european', op.K, op.OP_NPER))
+    european.build()
+    european.describe()
+
+    american = ControlVariate(op.OptionParameters(op.OPT, 'american', op.K, op.OP_NPER))
+    american.build(shares, security_params)
+    american.describe()
@@ -13,7 +13,10 @@ https://www.coursera.org/learn/financial-engineering-1/home/welcome
 
 @author: charles mégnin
 """
+import numpy as np
 import lattice as lt
+import kernels as kn
+import short_rate as sr
 import options as op
 
 #### PARAMETERS ####
@@ -35,6 +38,10 @@ BOND_FACE = 100 # Bond face value normally 100
 BOND_NPER = 6
 BOND_COUPON = .1
 
+# Callable/puttable bond schedules {period: price}, ex-coupon
+CALL_SCHEDULE = {2: 102., 4: 100.}
+PUT_SCHEDULE  = {3: 98.}
+
 # Forward/future parameters
 FF_FACE = 100 # Bond face value normally 100
 FF_NPER = 4
@@ -43,82 +50,49 @@ FF_TYPE = 'forward'
 ### Derivative selection to be set in main driver ###
 
 ### SHORT RATE LATTICE ###
-class TermStructureParameters(lt.Parameters):
-    ''' Encapsulates parameters for the underlying security
-        Base parameters for all fixed income derivatives
-    '''
+class TermStructureParameters(sr.TermStructureParameters):
+    ''' Term structure parameters defaulting to the constants of this module '''
     # pylint: disable=too-few-public-methods
 
-    def __init__(self):
-        self.init  = TS_R00
-        self.r_ud  = TS_RUD
-        self.rnp   = TS_RNP
-        super().__init__(TS_NPER)
-
-
-    def describe(self):
-        ''' Prints summary parameters to stdout '''
-        print(f'Initial price: {self.init:.2%}')
-        print(f'Up-down rate: {self.r_ud}')
-        print(f'Risk-neutral probability: {self.rnp}')
-        super().describe()
-
-
+    def __init__(self, init=None, r_ud=None, rnp=None, nperiods=None):
+        super().__init__(TS_R00 if init is None else init,
+                         TS_RUD if r_ud is None else r_ud,
+                         TS_RNP if rnp is None else rnp,
+                         TS_NPER if nperiods is None else nperiods)
 
-class ShortRate(lt.Lattice):
-    ''' Short rate lattice: base lattice for all fixed-income derivatives '''
 
-    def __init__(self, term_structure_parameters):
-        self.parameters = term_structure_parameters
-        super().__init__(self.parameters.nperiods)
-        self._build() # auto-build
 
-
-    def _build(self): # build the lattice
-        self.lattice[0][0] = self.parameters.init
-        for period in range(1, self.size+1):
-            for state in range(0, period+1):
-                if state == 0:
-                    s_prev = self.lattice[state][period-1]
-                    self.lattice[state][period] = self.parameters.r_ud[1] * s_prev
-                else:
-                    s_prev = self.lattice[state-1][period-1]
-                    self.lattice[state][period] = self.parameters.r_ud[0] * s_prev
-
-
-    def describe(self):
-        '''Self-descriptor'''
-        super().describe('Interest rate term structure', self.parameters, True)
+ShortRate = sr.ShortRate
 
 
 
 class ZCBOptions(op.Options):
     ''' Options for Zero coupon bonds / Subclass of Options '''
 
-    def __init__(self, opt_params):
-        self.rnp        = term_params.rnp
+    def __init__(self, opt_params, keep=None, path=None):
+        self.rnp        = None # taken from the short-rate lattice
         self.parameters = opt_params
-        super().__init__(self.parameters)
+        super().__init__(self.parameters, keep, path)
 
 
     def build(self, underlying, sh_rate):
         ''' Over rides Options build method '''
         self._set_option_flags(self.parameters)
+        self.rnp = sh_rate.parameters.rnp
         strike = self.parameters.strike
 
-        for period in range(self.size, -1, -1):
-            for state in range(period, -1, -1):
-                e_val = self.flags[0]*(underlying.lattice[state][period]-strike)
-                if period == self.size:
-                    self.lattice[state][period] = max(0., e_val)
-                else :
-                    num   = self._back_prop(state, period, self.rnp)
-                    denom = 1.0 + sh_rate.lattice[state][period]
-                    c_val = num / denom
-                    if self.flags[1] == 'E': # european options
-                        self.lattice[state][period] = c_val
-                    else: # american options
-                        self.lattice[state][period] = max(e_val, c_val)
+        e_val  = self.flags[0]*(underlying.time_slice(self.size)-strike)
+        values = np.maximum(e_val, 0.)
+        self._store_slice(self.size, values)
+        for period in range(self.size-1, -1, -1):
+            num   = self._back_prop_slice(values, self.rnp)
+            c_val = num / (1.0 + sh_rate.time_slice(period))
+            if self.flags[1] == 'E': # european options
+                values = c_val
+            else: # american options
+                e_val  = self.flags[0]*(underlying.time_slice(period)-strike)
+                values = np.maximum(e_val, c_val)
+            self._store_slice(period, values)
 
 
     def describe(self):
@@ -143,23 +117,22 @@ class BondParameters(lt.Parameters):
 
 
 class Bond(lt.Lattice):
-    def __init__(self, bond_parameters):
+    def __init__(self, bond_parameters, keep=None, path=None):
         self.parameters = bond_parameters
-        super().__init__(self.parameters.nperiods)
+        super().__init__(self.parameters.nperiods, keep, path)
 
 
-    def build(self, term_par, sh_rate):
+    def build(self, term_par, sh_rate=None):
         ''' build the zero-coupon bond lattice'''
-        for period in range(self.size, -1, -1):
-            for state in range(period, -1, -1):
-                if period == self.size:
-                    self.lattice[state][period]  = self.parameters.face
-                    self.lattice[state][period] *= (1. + self.parameters.coupon)
-                else:
-                    num  = self._back_prop(state, period, term_par.rnp)
-                    denom = 1 + sh_rate.lattice[state][period]
-                    self.lattice[state][period]  = num / denom
-                    self.lattice[state][period] += self.parameters.face*self.parameters.coupon
+        if sh_rate is None: # shared curve
+            sh_rate = sr.REGISTRY.short_rate(term_par)
+        coupon = self.parameters.face*self.parameters.coupon
+        values = np.full(self.size+1, self.parameters.face*(1. + self.parameters.coupon))
+        self._store_slice(self.size, values)
+        for period in range(self.size-1, -1, -1):
+            values = kn.bond_step(values, sh_rate.time_slice(period),
+                                  term_par.rnp[0], term_par.rnp[1], coupon)
+            self._store_slice(period, values)
 
 
     def describe(self):
@@ -168,6 +141,82 @@ class Bond(lt.Lattice):
 
 
 
+class CallableBondParameters(BondParameters):
+    '''Parameters for callable & puttable bonds
+       call & put: {period: price} schedules, ex-coupon: at a call date
+       the issuer may redeem the bond at the call price, at a put date
+       the holder may sell it back at the put price'''
+    # pylint: disable=too-many-arguments
+    def __init__(self, bond_face, bond_coupon, bond_nper, call=None, put=None):
+        super().__init__(bond_face, bond_coupon, bond_nper)
+        self.call = {} if call is None else dict(call)
+        self.put  = {} if put is None else dict(put)
+        for name, schedule in (('Call', self.call), ('Put', self.put)):
+            if any(period < 0 or period >= bond_nper for period in schedule):
+                raise Exception(f'{name} periods should be in 0..{bond_nper-1}. '
+                                f'Value is: {sorted(schedule)}')
+        # per-period exercise prices, +inf / -inf where there is no exercise
+        self.call_price = np.full(bond_nper, np.inf)
+        self.put_price  = np.full(bond_nper, -np.inf)
+        self.call_price[list(self.call)] = list(self.call.values())
+        self.put_price[list(self.put)]   = list(self.put.values())
+
+
+    def describe(self):
+        ''' Prints summary parameters to stdout '''
+        for name, schedule in (('Call', self.call), ('Put', self.put)):
+            if schedule:
+                print(f'{name} schedule: ' +
+                      ', '.join(f't={period}: {price}' for period, price in sorted(schedule.items())))
+        super().describe()
+
+
+
+class CallableBond(lt.Lattice):
+    ''' Callable & puttable coupon bonds
+        the straight bond & the bond with its call/put schedule are rolled
+        back together as a (2 x state) array in one backward pass; at each
+        exercise date the ex-coupon value of whole time slices is capped by
+        the call price and floored by the put price '''
+    def __init__(self, bond_parameters, keep=None, path=None):
+        self.parameters = bond_parameters
+        self.straight   = None # price without call & put
+        self.called     = None # states called by the issuer, per period
+        self.put        = None # states put by the holder, per period
+        super().__init__(self.parameters.nperiods, keep, path)
+
+
+    def build(self, term_par, sh_rate=None):
+        ''' build the callable/puttable bond lattice '''
+        if sh_rate is None: # shared curve
+            sh_rate = sr.REGISTRY.short_rate(term_par)
+        par         = self.parameters
+        coupon      = par.face*par.coupon
+        self.called = np.zeros(self.size+1, dtype=int)
+        self.put    = np.zeros(self.size+1, dtype=int)
+        values      = np.full((2, self.size+1), par.face*(1. + par.coupon)) # straight, callable
+        self._store_slice(self.size, values[1])
+        for period in range(self.size-1, -1, -1):
+            values  = self._back_prop_slice(values, term_par.rnp)
+            values /= 1 + sh_rate.time_slice(period)
+            ex_coupon = values[1]
+            self.called[period] = np.count_nonzero(ex_coupon > par.call_price[period])
+            np.minimum(ex_coupon, par.call_price[period], out=ex_coupon)
+            self.put[period] = np.count_nonzero(ex_coupon < par.put_price[period])
+            np.maximum(ex_coupon, par.put_price[period], out=ex_coupon)
+            values += coupon
+            self._store_slice(period, values[1])
+        self.straight = values[0, 0]
+
+
+    def describe(self):
+        '''Self-descriptor'''
+        super().describe('Callable/puttable bond', self.parameters, False)
+        print(f'Straight bond: {self.straight:.4f}, '
+              f'embedded options: {self.straight - self.present_value():.4f}')
+
+
+
 ### BOND FORWARDS & FUTURES ###
 class BondFFParameters(lt.Parameters):
     '''Parameters for Bond forwards & futures'''
@@ -191,23 +240,21 @@ class BondFFParameters(lt.Parameters):
 
 class BondFF(lt.Lattice):
     ''' Lattice for Forward & Futures on bonds '''
-    def __init__(self, bond_params):
+    def __init__(self, bond_params, keep=None, path=None):
         self.parameters = bond_params
-        super().__init__(self.parameters.nperiods)
+        super().__init__(self.parameters.nperiods, keep, path)
 
 
     def build(self, ts_par, sh_rate, bond_l):
-        for period in range(self.size, -1, -1):
-            for state in range(period, -1, -1):
-                if period == self.size:
-                    self.lattice[state][period]  = bond_l.lattice[state][period]
-                    self.lattice[state][period] -= 100 * self.parameters.coupon
-                else:
-                    num   = self._back_prop(state, period, ts_par.rnp)
-                    denom = 1.0
-                    if self.parameters.type == 'forward':
-                        denom += sh_rate.lattice[state][period]
-                    self.lattice[state][period] = num / denom
+        if sh_rate is None: # shared curve
+            sh_rate = sr.REGISTRY.short_rate(ts_par)
+        values = bond_l.time_slice(self.size) - 100 * self.parameters.coupon
+        self._store_slice(self.size, values)
+        for period in range(self.size-1, -1, -1):
+            values = self._back_prop_slice(values, ts_par.rnp)
+            if self.parameters.type == 'forward':
+                values = values / (1.0 + sh_rate.time_slice(period))
+            self._store_slice(period, values)
 
     def describe(self):
         '''Self-descriptor'''
@@ -223,7 +270,7 @@ if __name__ == '__main__':
 
     # Load underlying security-related parameters
     term_params = TermStructureParameters()
-    short_rates = ShortRate(term_params)
+    short_rates = sr.REGISTRY.short_rate(term_params)
     short_rates.display_lattice('Short-rate', True)
 
     bond = Bond(BondParameters(BOND_FACE, BOND_COUPON, BOND_NPER))
@@ -236,6 +283,12 @@ if __name__ == '__main__':
     ffbond.display_lattice(str.capitalize(FF_TYPE))
     ffbond.describe()
 
+    callable_bond = CallableBond(CallableBondParameters(BOND_FACE, BOND_COUPON, BOND_NPER,
+                                                        CALL_SCHEDULE, PUT_SCHEDULE))
+    callable_bond.build(term_params, short_rates)
+    callable_bond.display_lattice('Callable/puttable bond')
+    callable_bond.describe()
+
 
 
 
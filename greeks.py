@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 09:12:40 2026
+
+Lattice sensitivities of european & american options on shares
+
+delta, gamma & theta are read from the first time slices of the
+Shares & Options lattices of a single build
+vega & rho are central bump-and-reprice differences; lazy Shares
+lattices (O(N) memory) are cached so that rate bumps (which leave u & d
+unchanged) reuse them
+
+@author: charles mégnin
+"""
+import options as op
+
+#### PARAMETERS ####
+VOL_BUMP  = .01 # absolute volatility bump for vega
+RATE_BUMP = .0001 # absolute rate bump for rho
+#### END PARAMETERS ####
+
+
+class Greeks():
+    ''' Computes delta, gamma, theta, vega & rho of an option '''
+
+    def __init__(self, sec_par, opt_par):
+        self.sec_parameters    = sec_par
+        self.option_parameters = opt_par
+        self.shares_cache      = {} # (S0, T, sigma, N) -> lazy Shares lattice
+        self.price_cache       = {} # all security parameters -> option price
+        self.hits              = 0
+        self.misses            = 0
+        self.greeks            = {}
+
+
+    @staticmethod
+    def _bumped(sec_par, **bump):
+        ''' returns a copy of sec_par with some parameters bumped '''
+        values = {'init': sec_par.init, 'matur': sec_par.matur, 'volat': sec_par.volat,
+                  'nperiods': sec_par.nperiods, 'rate': sec_par.rate,
+                  'dividend': sec_par.dividend}
+        for key, delta in bump.items():
+            values[key] += delta
+        return op.SecurityParameters(**values)
+
+
+    def _shares(self, sec_par):
+        ''' returns the Shares lattice for sec_par, built once per u/d '''
+        key = (sec_par.init, sec_par.matur, sec_par.volat, sec_par.nperiods)
+        if key in self.shares_cache:
+            self.hits += 1
+        else:
+            self.misses += 1
+            shares = op.Shares(sec_par, lazy=True)
+            shares.build()
+            self.shares_cache[key] = shares
+        return self.shares_cache[key]
+
+
+    def _options(self, sec_par, keep):
+        ''' builds the options lattice on the cached shares lattice '''
+        options = op.Options(self.option_parameters, keep)
+        options.build(self._shares(sec_par), sec_par)
+        return options
+
+
+    def _price(self, sec_par):
+        ''' option price C0 for sec_par, repriced only if not cached '''
+        key = (sec_par.init, sec_par.matur, sec_par.volat, sec_par.nperiods,
+               sec_par.rate, sec_par.dividend)
+        if key not in self.price_cache:
+            self.price_cache[key] = self._options(sec_par, 1).present_value()
+        return self.price_cache[key]
+
+
+    def compute(self):
+        ''' computes all greeks; returns a dictionary '''
+        sec_par = self.sec_parameters
+        if min(sec_par.nperiods, self.option_parameters.nperiods) < 2:
+            raise Exception('Greeks need at least 2 periods: NPER='
+                            f'{sec_par.nperiods}, OP_NPER={self.option_parameters.nperiods}')
+        shares  = self._shares(sec_par)
+        options = self._options(sec_par, 3) # keep slices t=0, 1 & 2
+        self.price_cache[(sec_par.init, sec_par.matur, sec_par.volat, sec_par.nperiods,
+                          sec_par.rate, sec_par.dividend)] = options.present_value()
+
+        spot_1, value_1 = shares.time_slice(1), options.time_slice(1)
+        spot_2, value_2 = shares.time_slice(2), options.time_slice(2)
+        delta_up   = (value_2[2] - value_2[1]) / (spot_2[2] - spot_2[1])
+        delta_down = (value_2[1] - value_2[0]) / (spot_2[1] - spot_2[0])
+        d_time     = sec_par.matur / sec_par.nperiods
+
+        self.greeks = {'price': options.present_value(),
+                       'delta': (value_1[1] - value_1[0]) / (spot_1[1] - spot_1[0]),
+                       'gamma': (delta_up - delta_down) / (.5 * (spot_2[2] - spot_2[0])),
+                       # S^1_2 = S0 since u*d=1
+                       'theta': (value_2[1] - options.present_value()) / (2. * d_time)}
+
+        up_price   = self._price(self._bumped(sec_par, volat=VOL_BUMP))
+        down_price = self._price(self._bumped(sec_par, volat=-VOL_BUMP))
+        self.greeks['vega'] = (up_price - down_price) / (2. * VOL_BUMP)
+
+        up_price   = self._price(self._bumped(sec_par, rate=RATE_BUMP))
+        down_price = self._price(self._bumped(sec_par, rate=-RATE_BUMP))
+        self.greeks['rho'] = (up_price - down_price) / (2. * RATE_BUMP)
+        self.greeks = {name: float(value) for name, value in self.greeks.items()}
+        return self.greeks
+
+
+    def describe(self):
+        '''Self-descriptor'''
+        print('\n*** Greeks ***')
+        for name, value in self.greeks.items():
+            print(f'{str.capitalize(name)}: {value:.5f}')
+        print(f'Shares lattice cache: {self.hits} hits / {self.misses} builds')
+
+
+
+if __name__ == '__main__':
+    security_params = op.SecurityParameters()
+    option_params   = op.OptionParameters(op.OPT, op.TYPE, op.K, op.OP_NPER)
+
+    greeks = Greeks(security_params, option_params)
+    greeks.compute()
+    security_params.describe()
+    option_params.describe()
+    greeks.describe()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 11:05:18 2026
+
+Implied volatility of european & american options on shares
+
+Quotes are inverted in a batch: every iteration prices all the
+unconverged quotes (and their vega bump) in one OptionsBatch call.
+Newton steps use the lattice vega; a step that leaves the current
+[low, high] volatility bracket falls back to bisection.
+Solved volatilities are kept to warm-start the next solve from the
+neighbouring strikes. Quotes whose price does not depend on volatility
+(american quotes at or below intrinsic value + tol, or a zero vega at
+the solution) have no implied volatility: NaN, not converged.
+
+@author: charles mégnin
+"""
+import numpy as np
+import options as op
+
+#### PARAMETERS ####
+VOL_MIN   = .01 # volatility bracket
+VOL_MAX   = 5.0
+VOL_GUESS = op.SIGMA # initial guess without warm start
+VEGA_BUMP = 1e-4 # forward difference bump for the lattice vega
+PRICE_TOL = 1e-8 # convergence on |price - quote|
+MAX_ITER  = 50
+#### END PARAMETERS ####
+
+
+class ImpliedVolSolver():
+    ''' Newton/bisection implied volatility solver on the binomial lattice
+        options expire at the end of the lattice (OP_NPER = NPER) '''
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, nperiods=None, tol=PRICE_TOL, max_iter=MAX_ITER):
+        self.nperiods   = op.NPER if nperiods is None else nperiods
+        self.tol        = tol
+        self.max_iter   = max_iter
+        self.vols       = None
+        self.iterations = None # per quote
+        self.converged  = None # per quote
+        self.passes     = 0 # batch pricing calls of the last solve
+        self.solved     = (np.empty(0), np.empty(0)) # strikes, vols for warm starts
+
+
+    def initial_guess(self, strikes):
+        ''' volatilities interpolated from the last solved neighbouring strikes '''
+        solved_strikes, solved_vols = self.solved
+        if solved_strikes.size == 0:
+            return np.full(np.shape(strikes), VOL_GUESS)
+        order = np.argsort(solved_strikes)
+        return np.interp(strikes, solved_strikes[order], solved_vols[order])
+
+
+    def _price_vega(self, vols, quotes):
+        ''' lattice prices & vegas of the quotes at vols, in one batch '''
+        twice   = lambda x: np.concatenate([x, x])
+        sec_par = op.SecurityParametersBatch(twice(quotes['init']),
+                                             twice(quotes['matur']),
+                                             np.concatenate([vols, vols + VEGA_BUMP]),
+                                             self.nperiods,
+                                             twice(quotes['rate']),
+                                             twice(quotes['dividend']))
+        opt_par = op.OptionChainParameters(twice(quotes['opt']), twice(quotes['type']),
+                                           twice(quotes['strike']), self.nperiods)
+        prices  = op.OptionsBatch(opt_par).build(sec_par)
+        half    = vols.size
+        return prices[:half], (prices[half:] - prices[:half]) / VEGA_BUMP
+
+
+    def solve(self, prices, strikes, opts='call', option_types='european',
+              guess=None, **sec_par):
+        ''' implied volatilities of the quoted prices
+            sec_par: optional init, matur, rate & dividend (scalars or arrays)
+            guess: initial volatilities, defaults to the warm start '''
+        # pylint: disable=too-many-arguments, too-many-locals
+        target = np.atleast_1d(np.asarray(prices, dtype=float))
+        shape  = target.shape
+        quotes = {'strike': strikes, 'opt': opts, 'type': option_types,
+                  'init': sec_par.get('init', op.S0), 'matur': sec_par.get('matur', op.T_YRS),
+                  'rate': sec_par.get('rate', op.R), 'dividend': sec_par.get('dividend', op.DIV)}
+        quotes = {key: np.broadcast_to(np.asarray(value), shape).ravel()
+                  for key, value in quotes.items()}
+        target = target.ravel()
+        if guess is None:
+            guess = self.initial_guess(quotes['strike'].astype(float))
+
+        vols       = np.clip(np.broadcast_to(guess, target.shape).astype(float),
+                             VOL_MIN, VOL_MAX)
+        low        = np.full(target.shape, VOL_MIN)
+        high       = np.full(target.shape, VOL_MAX)
+        iterations = np.zeros(target.shape, dtype=int)
+        converged  = np.zeros(target.shape, dtype=bool)
+        # american quotes at intrinsic value are exercised at any volatility
+        flag       = np.where(np.char.lower(quotes['opt'].astype(str)) == 'put', -1., 1.)
+        intrinsic  = np.maximum(flag * (quotes['init'].astype(float)
+                                        - quotes['strike'].astype(float)), 0.)
+        american   = np.char.lower(quotes['type'].astype(str)) == 'american'
+        active     = np.flatnonzero(~(american & (target <= intrinsic + self.tol)))
+        self.passes = 0
+        while active.size and self.passes < self.max_iter:
+            self.passes += 1
+            price, vega = self._price_vega(vols[active],
+                                           {key: value[active] for key, value in quotes.items()})
+            diff = price - target[active]
+            iterations[active] += 1
+            done = np.abs(diff) < self.tol
+            converged[active[done & (vega != 0.)]] = True # flat price: no solution
+
+            # price increases with volatility: shrink the bracket
+            high[active] = np.where(diff > 0, vols[active], high[active])
+            low[active]  = np.where(diff < 0, vols[active], low[active])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                step = vols[active] - diff / vega
+            bisect = ~((step > low[active]) & (step < high[active]))
+            vols[active] = np.where(done, vols[active],
+                                    np.where(bisect, .5 * (low[active] + high[active]), step))
+            # quotes outside the bracket collapse onto one of its ends
+            stuck  = high[active] - low[active] < 1e-12
+            active = active[~done & ~stuck]
+
+        self.vols       = np.where(converged, vols, np.nan).reshape(shape)
+        self.iterations = iterations.reshape(shape)
+        self.converged  = converged.reshape(shape)
+        self.solved     = (quotes['strike'][converged].astype(float), vols[converged])
+        return self.vols
+
+
+    def describe(self):
+        '''Self-descriptor'''
+        print('\n*** Implied volatilities ***')
+        print(f'Quotes: {self.vols.size} / converged: {np.count_nonzero(self.converged)}')
+        print(f'Batch pricing passes: {self.passes}')
+        print(f'Iterations per quote: mean {self.iterations.mean():.2f} '
+              f'/ max {self.iterations.max()}')
+
+
+
+if __name__ == '__main__':
+    # round trip: price a chain at SIGMA, then recover SIGMA
+    chain_strikes = np.linspace(80., 120., 9)
+    chain_params  = op.OptionChainParameters(op.OPT, op.TYPE, chain_strikes, op.NPER)
+    quoted        = op.OptionsBatch(chain_params).build(op.SecurityParametersBatch())
+
+    solver = ImpliedVolSolver()
+    solver.solve(quoted, chain_strikes, op.OPT, op.TYPE, guess=.5)
+    solver.describe()
+    print(f'Volatilities: {solver.vols}')
+
+    # warm start from the chain just solved
+    solver.solve(quoted * 1.01, chain_strikes, op.OPT, op.TYPE)
+    solver.describe()
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 17:48:21 2026
+
+Opt-in instrumentation of the lattice builds
+
+Every build / _build method defined by a subclass of lattice.Lattice is
+routed through instrument(). Disabled (the default) the wrapper is a
+single test before the call. enable(sink) emits one record per build:
+    lattice, method, size, keep, seconds, nodes (computed by the build),
+    bytes (retained by the lattice), peak_bytes (tracemalloc, optional),
+    cache_hits & cache_misses (registered caches, e.g. short-rate registry)
+to a sink: MemorySink aggregates per lattice class, JsonLinesSink writes
+one JSON document per line.
+
+profile(target) attaches cProfile or a sampling profiler to the next
+build of the target lattice class.
+
+@author: charles mégnin
+"""
+import collections
+import contextlib
+import cProfile
+import functools
+import json
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+#### PARAMETERS ####
+SAMPLING_INTERVAL = .001 # seconds between two samples of the sampling profiler
+#### END PARAMETERS ####
+
+
+class _State():
+    ''' process-wide instrumentation state '''
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self):
+        self.sink         = None # None: instrumentation disabled
+        self.trace_memory = False
+        self.tracing      = False # tracemalloc started by enable()
+        self.profile      = None # pending ProfileRequest
+        self.active       = set() # ids of the lattices being recorded
+
+
+_STATE = _State()
+CACHES = {} # name -> cache exposing hits & misses counters
+
+
+def register_cache(name, cache):
+    ''' counts the hits & misses of cache in the build records '''
+    CACHES[name] = cache
+
+
+def _cache_counters():
+    return (sum(cache.hits for cache in CACHES.values()),
+            sum(cache.misses for cache in CACHES.values()))
+
+
+#### SINKS ####
+class MemorySink():
+    ''' aggregates the records per lattice class
+        keep_records=True also keeps every record '''
+
+    def __init__(self, keep_records=False):
+        self.keep_records = keep_records
+        self.records      = []
+        self.totals       = collections.defaultdict(collections.Counter)
+
+
+    def emit(self, record):
+        ''' adds one build record '''
+        if self.keep_records:
+            self.records.append(record)
+        totals = self.totals[record['lattice']]
+        totals['builds'] += 1
+        for field in ('seconds', 'nodes', 'bytes', 'cache_hits', 'cache_misses'):
+            totals[field] += record[field]
+
+
+    def close(self):
+        ''' nothing to release '''
+
+
+    def describe(self):
+        '''Self-descriptor'''
+        print('\n*** Lattice builds ***')
+        print(f"{'lattice':24s} {'builds':>7s} {'seconds':>10s} {'nodes':>12s} "
+              f"{'MiB':>9s} {'hits':>6s} {'misses':>6s}")
+        for name, totals in sorted(self.totals.items(), key=lambda item: -item[1]['seconds']):
+            print(f"{name:24s} {totals['builds']:7d} {totals['seconds']:10.4f} "
+                  f"{totals['nodes']:12d} {totals['bytes']/2**20:9.2f} "
+                  f"{totals['cache_hits']:6d} {totals['cache_misses']:6d}")
+
+
+
+class JsonLinesSink():
+    ''' writes each record as one JSON document per line '''
+
+    def __init__(self, path):
+        self.path   = path
+        self.output = open(path, 'a', encoding='utf-8') # pylint: disable=consider-using-with
+
+
+    def emit(self, record):
+        ''' appends one build record '''
+        self.output.write(json.dumps(record) + '\n')
+
+
+    def close(self):
+        ''' flushes & closes the file '''
+        self.output.close()
+
+
+
+def enable(sink, trace_memory=False):
+    ''' starts recording the builds to sink
+        trace_memory=True also records the tracemalloc peak of each build '''
+    _STATE.sink         = sink
+    _STATE.trace_memory = trace_memory
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _STATE.tracing = True
+
+
+def disable():
+    ''' stops recording & closes the sink; returns it '''
+    sink, _STATE.sink = _STATE.sink, None
+    if _STATE.tracing:
+        tracemalloc.stop()
+    _STATE.trace_memory = _STATE.tracing = False
+    if sink is not None:
+        sink.close()
+    return sink
+
+
+@contextlib.contextmanager
+def instrumented(sink, trace_memory=False):
+    ''' records the builds of a with block '''
+    enable(sink, trace_memory)
+    try:
+        yield sink
+    finally:
+        disable()
+
+
+#### PROFILERS ####
+class SamplingProfiler():
+    ''' samples the stack of one thread every interval seconds
+        counts[function] = samples where it was on the stack,
+        leaves[function] = samples where it was executing '''
+
+    def __init__(self, interval=SAMPLING_INTERVAL):
+        self.interval = interval
+        self.counts   = collections.Counter()
+        self.leaves   = collections.Counter()
+        self.samples  = 0
+        self._thread  = None
+        self._target  = None
+        self._stop    = threading.Event()
+
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target) # pylint: disable=protected-access
+            if frame is None:
+                continue
+            self.samples += 1
+            self.leaves[self._label(frame)] += 1
+            seen = set()
+            while frame is not None:
+                label = self._label(frame)
+                if label not in seen: # recursion counted once
+                    seen.add(label)
+                    self.counts[label] += 1
+                frame = frame.f_back
+
+
+    @staticmethod
+    def _label(frame):
+        code = frame.f_code
+        return f'{code.co_filename}:{code.co_firstlineno}({code.co_name})'
+
+
+    def enable(self):
+        ''' starts sampling the calling thread '''
+        self._target = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+
+    def disable(self):
+        ''' stops sampling '''
+        self._stop.set()
+        self._thread.join()
+
+
+    def print_stats(self, top=15):
+        ''' prints the functions most often on the stack / executing '''
+        print(f'{self.samples} samples every {1e3*self.interval:.1f} ms')
+        print(f"{'on stack':>9s} {'self':>6s}  function")
+        for label, count in self.counts.most_common(top):
+            print(f'{count:9d} {self.leaves[label]:6d}  {label}')
+
+
+
+class ProfileRequest():
+    ''' profiles the next build of the lattice class named target
+        (or of the lattices for which target(lattice) is true) '''
+
+    def __init__(self, target, profiler='cprofile', interval=SAMPLING_INTERVAL):
+        if profiler not in ('cprofile', 'sampling'):
+            raise Exception(f'profiler should be "cprofile" or "sampling". Value is: "{profiler}"')
+        self.target   = target
+        self.profiler = profiler
+        self.interval = interval
+        self.record   = None # lattice, method & size of the profiled build
+        self.stats    = None # pstats.Stats or SamplingProfiler
+
+
+    def matches(self, lattice):
+        ''' True if lattice is the build to profile '''
+        if callable(self.target):
+            return self.target(lattice)
+        return type(lattice).__name__ == self.target
+
+
+    def run(self, method, lattice, args, kwargs):
+        ''' calls the build under the profiler '''
+        if self.profiler == 'cprofile':
+            profiler = cProfile.Profile()
+        else:
+            profiler = SamplingProfiler(self.interval)
+        profiler.enable()
+        try:
+            return method(lattice, *args, **kwargs)
+        finally:
+            profiler.disable()
+            self.stats = pstats.Stats(profiler) if self.profiler == 'cprofile' else profiler
+            self.record = {'lattice': type(lattice).__name__, 'method': method.__name__,
+                           'size': lattice.size}
+
+
+    def print_stats(self, top=15):
+        ''' prints the profile of the build '''
+        if self.stats is None:
+            raise Exception(f'No build of "{self.target}" was profiled')
+        print(f"\n*** Profile of {self.record['lattice']}.{self.record['method']} "
+              f"(size {self.record['size']}) ***")
+        if self.profiler == 'cprofile':
+            self.stats.sort_stats('cumulative').print_stats(top)
+        else:
+            self.stats.print_stats(top)
+
+
+
+def profile(target, profiler='cprofile', interval=SAMPLING_INTERVAL):
+    ''' profiles the next build of target (lattice class name or predicate)
+        with cProfile or the sampling profiler; returns the ProfileRequest '''
+    _STATE.profile = ProfileRequest(target, profiler, interval)
+    return _STATE.profile
+
+
+#### BUILD WRAPPER ####
+def _record(method, lattice, args, kwargs):
+    ''' calls the build & emits its record '''
+    _STATE.active.add(id(lattice))
+    hits, misses = _cache_counters()
+    if _STATE.trace_memory:
+        tracemalloc.reset_peak()
+    request = _STATE.profile
+    start   = time.perf_counter()
+    try:
+        if request is not None and request.matches(lattice):
+            _STATE.profile = None # one build per request
+            result = request.run(method, lattice, args, kwargs)
+        else:
+            result = method(lattice, *args, **kwargs)
+    finally:
+        _STATE.active.discard(id(lattice))
+    seconds = time.perf_counter() - start
+    if _STATE.sink is not None:
+        new_hits, new_misses = _cache_counters()
+        _STATE.sink.emit({'lattice': type(lattice).__name__, 'method': method.__name__,
+                          'size': lattice.size, 'keep': lattice.keep, 'seconds': seconds,
+                          'nodes': lattice.node_count(), 'bytes': lattice.stored_bytes(),
+                          'peak_bytes': (tracemalloc.get_traced_memory()[1]
+                                         if _STATE.trace_memory else None),
+                          'cache_hits': new_hits - hits, 'cache_misses': new_misses - misses})
+    return result
+
+
+def instrument(method):
+    ''' wraps a lattice build method; a plain call while disabled '''
+    @functools.wraps(method)
+    def wrapper(lattice, *args, **kwargs):
+        if (_STATE.sink is None and _STATE.profile is None) or id(lattice) in _STATE.active:
+            return method(lattice, *args, **kwargs)
+        return _record(method, lattice, args, kwargs)
+    return wrapper
+
+
+
+if __name__ == '__main__':
+    # the lattices report to the imported module, not to __main__
+    import instrumentation as ins
+    import options as op
+    import term_structure as ts
+
+    aggregator = ins.MemorySink()
+    with ins.instrumented(aggregator, trace_memory=True):
+        security_params = op.SecurityParameters(nperiods=2000)
+        shares = op.Shares(security_params)
+        shares.build()
+        for strike in (90., 100., 110.):
+            option = op.Options(op.OptionParameters('put', 'american', strike, 2000), keep=1)
+            option.build(shares, security_params)
+        term_params = ts.TermStructureParameters()
+        for rate in (.04, .05, .06):
+            ts.Swap(ts.SwapParameters(ts.SWAP_NPER, rate)).build(term_params)
+    aggregator.describe()
+
+    request = ins.profile('Options')
+    option = op.Options(op.OptionParameters('put', 'american', 100., 2000), keep=1)
+    option.build(shares, security_params)
+    request.print_stats(8)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 22:18:50 2026
+
+One-period induction kernels of the binomial lattices
+    american_step: Options.build, continuation value vs exercise
+    bond_step:     Bond.build, discounting plus coupon
+    swap_step:     Swap.build, payment plus discounting at each node
+    forward_step:  ElementaryPrices.build, forward induction
+with a NumPy backend & a Numba backend compiled when numba is installed.
+
+Both backends evaluate the same floating-point operations in the same
+order (no fastmath), so prices are identical whichever is selected.
+The backend is resolved at import from BACKEND ('auto' checks that
+numba is installed without importing it) and can be switched at runtime
+with use(). numba is only imported, and the kernels compiled, when the
+numba backend is selected: by use(), warm_up() or the first kernel call,
+so importing the lattices stays cheap. Numba kernels are cached on disk
+(cache=True): warm_up() compiles or loads them once per process, e.g. in
+the initializer of a worker pool, before the first trade is priced.
+
+@author: charles mégnin
+"""
+import importlib.util
+import numpy as np
+
+#### PARAMETERS ####
+BACKEND = 'auto' # numpy, numba or auto (numba if installed)
+#### END PARAMETERS ####
+
+BACKENDS = ('numpy', 'numba')
+
+
+### NUMPY BACKEND ###
+def _american_step_numpy(values, spot, strike, flag, q_up, q_down, denom):
+    ''' returns (max(exercise, continuation), exercised) at t from values at t+1 '''
+    # pylint: disable=too-many-arguments
+    ratio  = (values[1:] * q_up + values[:-1] * q_down) / denom
+    ex_val = flag * (spot - strike)
+    return np.maximum(ex_val, ratio), ex_val > ratio
+
+
+def _bond_step_numpy(values, rates, q_up, q_down, coupon):
+    ''' returns E[V_(t+1)] / (1 + r_t) + coupon '''
+    return (values[1:] * q_up + values[:-1] * q_down) / (1 + rates) + coupon
+
+
+def _swap_step_numpy(values, rates, q_up, q_down, fixed_rate):
+    ''' returns (r_t - K + E[V_(t+1)]) / (1 + r_t) '''
+    num  = rates - fixed_rate
+    num += values[1:] * q_up + values[:-1] * q_down
+    return num / (1.0 + rates)
+
+
+def _forward_step_numpy(prices, rates, q_up, q_down):
+    ''' returns the elementary prices at t+1 from those at t '''
+    discounted = prices / (1. + rates)
+    forward = np.zeros(prices.size + 1)
+    forward[1:]  += q_up * discounted
+    forward[:-1] += q_down * discounted
+    return forward
+
+
+### NUMBA BACKEND ###
+def _american_step_loop(values, spot, strike, flag, q_up, q_down, denom):
+    # pylint: disable=too-many-arguments
+    size      = values.size - 1
+    result    = np.empty(size)
+    exercised = np.empty(size, dtype=np.bool_)
+    for state in range(size):
+        ratio  = (values[state+1] * q_up + values[state] * q_down) / denom
+        ex_val = flag * (spot[state] - strike)
+        exercised[state] = ex_val > ratio
+        result[state]    = ex_val if ex_val >= ratio else ratio # np.maximum
+    return result, exercised
+
+
+def _bond_step_loop(values, rates, q_up, q_down, coupon):
+    size   = values.size - 1
+    result = np.empty(size)
+    for state in range(size):
+        result[state] = (values[state+1] * q_up + values[state] * q_down) \
+                        / (1 + rates[state]) + coupon
+    return result
+
+
+def _swap_step_loop(values, rates, q_up, q_down, fixed_rate):
+    size   = values.size - 1
+    result = np.empty(size)
+    for state in range(size):
+        num  = rates[state] - fixed_rate
+        num += values[state+1] * q_up + values[state] * q_down
+        result[state] = num / (1.0 + rates[state])
+    return result
+
+
+def _forward_step_loop(prices, rates, q_up, q_down):
+    size    = prices.size
+    forward = np.zeros(size + 1)
+    for state in range(size):
+        discounted = prices[state] / (1. + rates[state])
+        forward[state+1] += q_up * discounted
+        forward[state]   += q_down * discounted
+    return forward
+
+
+KERNELS = {'numpy': {'american_step': _american_step_numpy,
+                     'bond_step':     _bond_step_numpy,
+                     'swap_step':     _swap_step_numpy,
+                     'forward_step':  _forward_step_numpy}}
+KERNEL_NAMES = tuple(KERNELS['numpy'])
+
+
+def _numba_installed():
+    ''' True if numba can be imported (without importing it) '''
+    return importlib.util.find_spec('numba') is not None
+
+
+def _kernels(backend):
+    ''' kernels of backend; the numba ones are compiled on first use '''
+    if backend == 'numba' and 'numba' not in KERNELS:
+        import numba # pylint: disable=import-outside-toplevel
+        KERNELS['numba'] = {'american_step': numba.njit(cache=True)(_american_step_loop),
+                            'bond_step':     numba.njit(cache=True)(_bond_step_loop),
+                            'swap_step':     numba.njit(cache=True)(_swap_step_loop),
+                            'forward_step':  numba.njit(cache=True)(_forward_step_loop)}
+    return KERNELS[backend]
+
+
+def _resolve(backend):
+    ''' name of the backend selected by backend (numpy, numba or auto) '''
+    if backend == 'auto':
+        backend = 'numba' if _numba_installed() else 'numpy'
+    if backend not in BACKENDS:
+        raise Exception(f'Kernel backend should be one of {BACKENDS}. Value is: "{backend}"')
+    if backend == 'numba' and not _numba_installed():
+        raise Exception(f'The "{backend}" kernel backend requires {backend} to be installed')
+    return backend
+
+
+### BACKEND SELECTION ###
+def _deferred(name):
+    ''' placeholder of kernel name until the backend is loaded:
+        the first call loads it (imports & compiles numba if selected) '''
+    def first_call(*args):
+        use(ACTIVE, warm=False)
+        return globals()[name](*args)
+    first_call.__name__ = name
+    return first_call
+
+
+def warm_up():
+    ''' runs every kernel of the selected backend once on small arrays:
+        compiles (or loads from the disk cache) the numba kernels '''
+    values = np.linspace(1., 2., 3)
+    rates  = np.full(2, .05)
+    american_step(values, rates, 1.5, -1.0, .5, .5, 1.01)
+    bond_step(values, rates, .5, .5, .1)
+    swap_step(values, rates, .5, .5, .05)
+    forward_step(values[:2], rates, .5, .5)
+
+
+def use(backend=BACKEND, warm=True):
+    ''' selects the kernels of backend (numpy, numba or auto) '''
+    global ACTIVE # pylint: disable=global-statement
+    backend = _resolve(backend)
+    globals().update(_kernels(backend))
+    ACTIVE = backend
+    if warm:
+        warm_up()
+    return backend
+
+
+# name of the selected backend & its kernels, loaded on first call, by use() or warm_up()
+ACTIVE = _resolve(BACKEND)
+american_step, bond_step, swap_step, forward_step = (_deferred(name) for name in KERNEL_NAMES)
@@ -7,7 +7,9 @@ Created on Mon Jan 18 15:07:27 2021
 
 @author: charly
 """
-import pandas as pd
+import numpy as np
+import instrumentation as ins
+import kernels as kn
 
 
 class Parameters():
@@ -36,44 +38,168 @@ class Parameters():
 
 
 
+def _import_pandas():
+    ''' pandas is only needed to display lattices: imported on first use
+        so that pricing does not load it; None if it is not installed '''
+    try:
+        import pandas # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+    return pandas
+
+
+def _render_text(nodes, float_format):
+    ''' plain-text table of the nodes, last state first, NaN left blank
+        (the layout of DataFrame.to_string) '''
+    cells   = [[str(period) for period in range(nodes.shape[1])]]
+    labels  = ['']
+    for state in range(nodes.shape[0]-1, -1, -1):
+        labels.append(str(state))
+        cells.append(['' if np.isnan(node) else float_format(node) for node in nodes[state]])
+    widths  = [max(len(row[column]) for row in cells) for column in range(nodes.shape[1])]
+    label_w = max(len(label) for label in labels)
+    lines   = [' '.join([label.ljust(label_w)] +
+                        [cell.rjust(width) for cell, width in zip(row, widths)]).rstrip()
+               for label, row in zip(labels, cells)]
+    return '\n'.join(lines)
+
+
+
 class Lattice:
     ''' Lattice superclass encapsulates parameters and functionality
-        common to Shares, Options, Futures & fixed income derivatives'''
+        common to Shares, Options, Futures & fixed income derivatives
+        branches: successors of a node, state i at t leads to states
+        i..i+branches-1 at t+1 (2: binomial, 3: trinomial) '''
+    branches = 2
 
-    def __init__(self, size):
-        # build a size x size list populated with 0
-        self.lattice = [['' for x in range(size+1)] for y in range(size+1)]
+    def __init__(self, size, keep=None, path=None):
+        # keep=None: full lattice
+        # keep=n: price-only mode, only time slices 0..n-1 are retained
+        #         (n=1 keeps the price, n=3 is enough for the Greeks)
+        # path: full lattice stored in a memory-mapped .npy file
+        #       (size=None opens an existing file read-only, see open_lattice)
+        self.keep    = keep
+        self.path    = path
+        self.slices  = {}
+        if keep is None:
+            # (size+1) x (size+1) float64 nodes stored period-major so that
+            # each time slice is contiguous; lattice[state][period] is a view.
+            # ((branches-1)*size+1 states for more than two branches)
+            # np.zeros is lazily committed: the unused lower triangle of the
+            # period-major buffer never becomes resident (nor allocated on
+            # disk in a sparse memory-mapped file).
+            if path is None:
+                self._nodes = np.zeros((size+1, self.states(size)))
+            elif size is None:
+                self._nodes = np.load(path, mmap_mode='r')
+                size = self._nodes.shape[0] - 1
+                if size > 0: # branches of the lattice that wrote the file
+                    self.branches = (self._nodes.shape[1] - 1) // size + 1
+            else:
+                self._nodes = np.lib.format.open_memmap(path, mode='w+', dtype=float,
+                                                        shape=(size+1, self.states(size)))
+            self.lattice = self._nodes.T
+        else:
+            self._nodes  = None
+            self.lattice = None
         self.size    = size
 
 
-    def _back_prop(self, row, column, rnp):
-        ''' returns risk neutral q*S^(i+1)_(t+1) + (1-q)*S^i_(t+1)
-            q = proba / S = lattice'''
-        p_1 = self.lattice[row + 1][column + 1] # S^(i+1)_(t+1)
-        p_2 = self.lattice[row][column + 1]     # S^(i)_(t+1)
+    def __init_subclass__(cls, **kwargs):
+        ''' routes the build methods of every subclass through the
+            opt-in instrumentation (a plain call unless enabled) '''
+        super().__init_subclass__(**kwargs)
+        for name in ('build', '_build'):
+            if name in cls.__dict__:
+                setattr(cls, name, ins.instrument(cls.__dict__[name]))
+
+
+    def states(self, period):
+        ''' number of states at period '''
+        return (self.branches-1) * period + 1
+
+
+    def node_count(self):
+        ''' number of nodes computed by a build: all states for t=0..size '''
+        return (self.size+1) * ((self.branches-1) * self.size + 2) // 2
+
+
+    def stored_bytes(self):
+        ''' bytes retained by the nodes or the kept time slices '''
+        nbytes = 0 if self._nodes is None else self._nodes.nbytes
+        return nbytes + sum(values.nbytes for values in self.slices.values())
+
+
+    def time_slice(self, period):
+        ''' returns states 0..period at time period
+            (a view of the lattice column in full mode) '''
+        if self.lattice is not None:
+            return self.lattice[:self.states(period), period]
+        if period not in self.slices:
+            raise Exception(f'Period {period} not kept in price-only mode (keep={self.keep})')
+        return self.slices[period]
+
+
+    def present_value(self):
+        ''' returns the value at the root node C0 '''
+        return self.time_slice(0)[0]
+
+
+    @staticmethod
+    def _back_prop_slice(values, rnp):
+        ''' risk-neutral back-propagation over a whole time slice
+            returns q*V^(i+1)_(t+1) + (1-q)*V^i_(t+1) for i=0..t
+            states are on the last axis so a batch of slices can be stacked '''
+        return values[..., 1:] * rnp[0] + values[..., :-1] * rnp[1]
+
+
+    @staticmethod
+    def _forward_prop_slice(prices, rates, rnp):
+        ''' forward induction of elementary (Arrow-Debreu) prices
+            returns P_(t+1) from P_t & the short rates r_t: state i+1 is
+            reached by an up move (proba q), state i by a down move (1-q) '''
+        return kn.forward_step(prices, rates, rnp[0], rnp[1])
 
-        return p_1 * rnp[0] + p_2 * rnp[1]
+
+    def _store_slice(self, period, values):
+        ''' writes the vector of states 0..period at time period
+            price-only mode copies it only if period is kept '''
+        if self.lattice is not None:
+            self.lattice[:self.states(period), period] = values
+        elif period < max(self.keep, 1):
+            self.slices[period] = np.array(values, dtype=float)
+
+
+    def flush(self):
+        ''' writes the time slices of a memory-mapped lattice to its file '''
+        if isinstance(self._nodes, np.memmap) and self._nodes.flags.writeable:
+            self._nodes.flush()
 
 
     def display_lattice(self, title, percent_flag=False):
         '''Prints lattice to stdout'''
+        if self.lattice is None:
+            raise Exception(f'{title} lattice was built in price-only mode')
         print(f'\n{title} lattice:')
-        dfr = pd.DataFrame(self.lattice)
-        # Format output
-        if percent_flag:
-            pd.options.display.float_format = '{:.2%}'.format
-            print(dfr.loc[::-1])
+        # blank out the nodes that are never written (state > period)
+        states, periods = np.indices(self.lattice.shape)
+        written = (states < self.states(periods)) & (periods <= self.size)
+        nodes   = np.where(written, self.lattice, np.nan)
+        float_format = '{:.2%}'.format if percent_flag else '{:.2f}'.format
+        pandas = _import_pandas()
+        if pandas is None:
+            print(_render_text(nodes, float_format))
         else:
-            pd.options.display.float_format = '{:.2f}'.format
-            print(dfr.loc[::-1])
+            print(pandas.DataFrame(nodes).loc[::-1].to_string(float_format=float_format,
+                                                              na_rep=''))
 
 
     def _display_price(self, percent_flag=False):
         '''Prints derivative price to stdout'''
         if percent_flag:
-            print(f'C0={self.lattice[0][0]:.2%}')
+            print(f'C0={self.present_value():.2%}')
         else:
-            print(f'C0={self.lattice[0][0]:.2f}')
+            print(f'C0={self.present_value():.2f}')
 
 
     def describe(self, title, parameters, percent):
@@ -86,3 +212,70 @@ class Lattice:
     def display_parameters(self):
         ''' Print all parameters in class '''
         print(f'\nclass parameters:{self.__dict__}')
+
+
+
+def open_lattice(path):
+    ''' opens a lattice built with path=... read-only & zero-copy:
+        time slices & nodes are read from the memory-mapped file on demand,
+        also from another process than the one that built it
+        (Swap & CapFloorLet files hold one unused period after their size) '''
+    return Lattice(None, path=path)
+
+
+
+class ClosedFormLattice(Lattice):
+    ''' Lattice of an underlying whose nodes are init * u^state * d^(period-state)
+        (Shares, ShortRate)
+        lazy=True never stores the nodes: time slices & single nodes are
+        evaluated on demand from the closed form
+        path stores the nodes in a memory-mapped file (ignored if lazy) '''
+
+    def __init__(self, size, init, r_ud, lazy=False, path=None):
+        # pylint: disable=too-many-arguments
+        self.init = init
+        self.r_ud = r_ud
+        self.lazy = lazy
+        super().__init__(size, 0 if lazy else None, None if lazy else path)
+        if lazy: # u^state & d^state for state=0..size, shared by all slices
+            states      = np.arange(size+1)
+            self._u_pow = init * np.power(r_ud[0], states)
+            self._d_pow = np.power(r_ud[1], states)
+
+
+    def _fill(self):
+        ''' stores the lattice slice by slice: S_t = [d*S^0_(t-1), u*S_(t-1)]
+            nothing to do in lazy mode '''
+        if self.lazy:
+            return
+        values = np.array([self.init], dtype=float)
+        self._store_slice(0, values)
+        for period in range(1, self.size+1):
+            values = np.concatenate(([self.r_ud[1] * values[0]], self.r_ud[0] * values))
+            self._store_slice(period, values)
+
+
+    def node_count(self):
+        ''' nothing is computed by a lazy build '''
+        return 0 if self.lazy else super().node_count()
+
+
+    def stored_bytes(self):
+        ''' a lazy lattice retains the powers of u & d '''
+        if self.lazy:
+            return self._u_pow.nbytes + self._d_pow.nbytes
+        return super().stored_bytes()
+
+
+    def time_slice(self, period):
+        ''' returns states 0..period at time period '''
+        if not self.lazy:
+            return super().time_slice(period)
+        return self._u_pow[:period+1] * self._d_pow[period::-1]
+
+
+    def node(self, state, period):
+        ''' returns a single node '''
+        if not self.lazy:
+            return self.lattice[state][period]
+        return self.init * self.r_ud[0]**state * self.r_ud[1]**(period-state)
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 21:40:08 2026
+
+Monte Carlo prices of path-dependent options on the shares of
+options.SecurityParameters: asian (arithmetic average), lookback &
+barrier options monitored at nperiods dates up to the maturity
+
+Log-normal paths are simulated exactly on the monitoring dates, CHUNK
+paths at a time, so that memory does not depend on the number of paths.
+Chunk k draws its normals from child k of np.random.SeedSequence(seed):
+prices are reproducible & identical in-process or on a process pool.
+Variance reduction:
+    antithetic: each normal path is paired with its negative
+    control: payoff regressed on a control variate of known mean
+        asian: geometric average option (closed form)
+        fixed-strike lookback & barrier: european option (Black-Scholes-Merton)
+        floating-strike lookback: terminal share price
+
+@author: charles mégnin
+"""
+import concurrent.futures
+import math
+import numpy as np
+import lattice as lt
+import options as op
+import black_scholes as bs
+
+#### PARAMETERS ####
+NPATHS = 100000 # simulated paths
+CHUNK  = 10000 # paths simulated at a time
+SEED   = 20201018
+
+# Path-dependent option
+MC_KIND      = 'asian' # asian, lookback or barrier
+MC_NPER      = 50 # monitoring dates
+BARRIER      = 130.0
+BARRIER_TYPE = 'up-and-out' # up/down-and-out/in
+#### END PARAMETERS ####
+
+BARRIER_TYPES = ('up-and-out', 'down-and-out', 'up-and-in', 'down-and-in')
+
+
+def _norm_cdf(value):
+    return .5 * math.erfc(-value / math.sqrt(2.))
+
+
+class PathOptionParameters(lt.Parameters):
+    ''' Encapsulates parameters of a path-dependent option
+        kind: asian, lookback or barrier
+        strike=None for a floating-strike lookback
+        barrier & barrier_type for barrier options
+        nperiods: monitoring dates, evenly spaced up to the maturity '''
+    # pylint: disable=too-many-arguments
+
+    def __init__(self, kind, opt, strike, nperiods, barrier=None, barrier_type=None):
+        self.kind = str.lower(kind)
+        self.opt  = str.lower(opt)
+        if self.kind not in ('asian', 'lookback', 'barrier'):
+            raise Exception(f'kind should be "asian", "lookback" or "barrier". Value is: "{kind}"')
+        if self.opt not in ('call', 'put'):
+            raise Exception(f'OPT should be "call" or "put". Value is: "{opt}"')
+        if self.kind == 'barrier' and barrier_type not in BARRIER_TYPES:
+            raise Exception(f'barrier_type should be one of {BARRIER_TYPES}. Value is: "{barrier_type}"')
+        if strike is None and self.kind != 'lookback':
+            raise Exception(f'A {self.kind} option needs a strike')
+        self.flag         = 1.0 if self.opt == 'call' else -1.0
+        self.strike       = strike
+        self.barrier      = barrier
+        self.barrier_type = barrier_type
+        super().__init__(nperiods)
+
+
+    def describe(self):
+        '''Prints summary options parameters to std out'''
+        strike = 'floating strike' if self.strike is None else f'strike={self.strike}'
+        print(f'{str.capitalize(self.kind)} {self.opt} option, {strike}')
+        if self.kind == 'barrier':
+            print(f'Barrier: {self.barrier_type} at {self.barrier}')
+        super().describe()
+
+
+
+def control_mean(sec_par, path_par):
+    ''' expectation of the control variate at maturity (undiscounted) '''
+    matur, rate = sec_par.matur, sec_par.rate
+    forward     = sec_par.init * math.exp((rate - sec_par.dividend) * matur)
+    if path_par.kind == 'lookback' and path_par.strike is None:
+        return forward # terminal share price
+    if path_par.kind in ('lookback', 'barrier'): # european option
+        european = op.OptionParameters(path_par.opt, 'european', path_par.strike,
+                                       sec_par.nperiods)
+        return bs.BlackScholes(sec_par, european).build() * math.exp(rate * matur)
+
+    # geometric average of S_1..S_N: log-normal with
+    # mean log S0 + (r-c-sigma^2/2) dt (N+1)/2, variance sigma^2 dt (N+1)(2N+1)/(6N)
+    nper   = path_par.nperiods
+    d_time = matur / nper
+    mean   = (math.log(sec_par.init)
+              + (rate - sec_par.dividend - .5 * sec_par.volat**2) * d_time * (nper+1) / 2.)
+    std    = sec_par.volat * math.sqrt(d_time * (nper+1) * (2*nper+1) / (6.*nper))
+    flag   = path_par.flag
+    d_1    = (mean - math.log(path_par.strike) + std**2) / std
+    return flag * (math.exp(mean + .5*std**2) * _norm_cdf(flag * d_1)
+                   - path_par.strike * _norm_cdf(flag * (d_1 - std)))
+
+
+def _payoffs(paths, init, path_par):
+    ''' (payoff, control) of each path, paths[path, date] for dates 1..N '''
+    flag, strike = path_par.flag, path_par.strike
+    terminal     = paths[:, -1]
+    if path_par.kind == 'asian':
+        average   = paths.mean(axis=1)
+        geometric = np.exp(np.log(paths).mean(axis=1))
+        return (np.maximum(flag * (average - strike), 0.),
+                np.maximum(flag * (geometric - strike), 0.))
+
+    european = None if strike is None else np.maximum(flag * (terminal - strike), 0.)
+    if path_par.kind == 'lookback': # extremes include S0
+        if flag > 0:
+            extreme = np.minimum(paths.min(axis=1), init) if strike is None else \
+                      np.maximum(paths.max(axis=1), init)
+        else:
+            extreme = np.maximum(paths.max(axis=1), init) if strike is None else \
+                      np.minimum(paths.min(axis=1), init)
+        if strike is None:
+            return flag * (terminal - extreme), terminal
+        return np.maximum(flag * (extreme - strike), 0.), european
+
+    if path_par.barrier_type.startswith('up'):
+        crossed = paths.max(axis=1) >= path_par.barrier
+    else:
+        crossed = paths.min(axis=1) <= path_par.barrier
+    alive = ~crossed if path_par.barrier_type.endswith('out') else crossed
+    return np.where(alive, european, 0.), european
+
+
+def simulate_chunk(sec_par, path_par, npaths, seed, antithetic=True):
+    ''' simulates npaths paths from seed (a SeedSequence)
+        returns the sums [n, y, c, y^2, c^2, y*c] of payoffs y & controls c
+        (antithetic pairs are averaged into one sample) '''
+    # pylint: disable=too-many-locals
+    nper   = path_par.nperiods
+    d_time = sec_par.matur / nper
+    drift  = (sec_par.rate - sec_par.dividend - .5 * sec_par.volat**2) * d_time
+    vol    = sec_par.volat * math.sqrt(d_time)
+    rng    = np.random.default_rng(seed)
+
+    normals = rng.standard_normal(((npaths+1) // 2 if antithetic else npaths, nper))
+    if antithetic:
+        normals = np.concatenate([normals, -normals])
+    paths  = np.cumsum(drift + vol * normals, axis=1, out=normals)
+    paths  = np.exp(paths, out=paths)
+    paths *= sec_par.init
+    payoff, control = _payoffs(paths, sec_par.init, path_par)
+    if antithetic:
+        half    = payoff.size // 2
+        payoff  = .5 * (payoff[:half] + payoff[half:])
+        control = .5 * (control[:half] + control[half:])
+    return np.array([payoff.size, payoff.sum(), control.sum(), payoff @ payoff,
+                     control @ control, payoff @ control])
+
+
+
+class MonteCarlo():
+    ''' Monte Carlo price & standard error of a path-dependent option '''
+    # pylint: disable=too-many-instance-attributes, too-many-arguments
+
+    def __init__(self, sec_par, path_par, npaths=NPATHS, chunk=CHUNK, seed=SEED,
+                 antithetic=True, control=True):
+        self.sec_parameters  = sec_par
+        self.path_parameters = path_par
+        self.npaths          = npaths
+        self.chunk           = chunk
+        self.seed            = seed
+        self.antithetic      = antithetic
+        self.control         = control
+        self.price           = None
+        self.stderr          = None
+        self.beta            = None # control variate coefficient
+
+
+    def _chunks(self):
+        ''' (paths, SeedSequence) of every chunk '''
+        sizes = [min(self.chunk, self.npaths - first) for first in range(0, self.npaths, self.chunk)]
+        return zip(sizes, np.random.SeedSequence(self.seed).spawn(len(sizes)))
+
+
+    def build(self, workers=0):
+        ''' simulates the paths; workers=0 in-process, None every core
+            returns the price '''
+        args = (self.sec_parameters, self.path_parameters)
+        if workers == 0:
+            sums = sum(simulate_chunk(*args, size, seed, self.antithetic)
+                       for size, seed in self._chunks())
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(simulate_chunk, *args, size, seed, self.antithetic)
+                           for size, seed in self._chunks()]
+                sums = sum(future.result() for future in futures) # in chunk order
+
+        count, sum_y, sum_c, sum_yy, sum_cc, sum_yc = sums
+        mean_y, mean_c = sum_y / count, sum_c / count
+        var_y = sum_yy / count - mean_y**2
+        var_c = sum_cc / count - mean_c**2
+        cov   = sum_yc / count - mean_y * mean_c
+        self.beta = cov / var_c if self.control and var_c > 0. else 0.
+        estimate  = mean_y
+        if self.beta:
+            estimate -= self.beta * (mean_c - control_mean(*args))
+        variance  = max(var_y - 2. * self.beta * cov + self.beta**2 * var_c, 0.)
+
+        discount    = math.exp(-self.sec_parameters.rate * self.sec_parameters.matur)
+        self.price  = discount * estimate
+        self.stderr = discount * math.sqrt(variance / count)
+        return self.price
+
+
+    def describe(self):
+        '''Self-descriptor'''
+        print('\n*** Monte Carlo price ***')
+        self.path_parameters.describe()
+        print(f'{self.npaths} paths (antithetic: {self.antithetic}, control: {self.control}, '
+              f'beta={self.beta:.4f})')
+        print(f'C0={self.price:.4f} +/- {self.stderr:.4f}')
+
+
+
+if __name__ == '__main__':
+    security_params = op.SecurityParameters()
+    option_params   = PathOptionParameters(MC_KIND, op.OPT, op.K, MC_NPER,
+                                           BARRIER, BARRIER_TYPE)
+    for antithetic, control in ((False, False), (True, False), (True, True)):
+        monte_carlo = MonteCarlo(security_params, option_params,
+                                 antithetic=antithetic, control=control)
+        monte_carlo.build()
+        monte_carlo.describe()
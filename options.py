@@ -13,8 +13,13 @@ https://www.coursera.org/learn/financial-engineering-1/home/welcome
 
 @author: charles mégnin
 """
+import logging
 import math
+import numpy as np
 import lattice as lt
+import kernels as kn
+
+LOGGER = logging.getLogger(__name__)
 
 #### PARAMETERS ####
 PRINT_LATTICES = True # print lattices to stdout
@@ -41,13 +46,16 @@ OP_NPER = 15 # expiration - accomodates diff w/ #periods in lattice (EXPO<=N)
 #### UNDERLYING SECURITY ####
 class SecurityParameters(lt.Parameters):
     '''Encapsulates parameters for the underlying security'''
-    # pylint: disable=too-many-instance-attributes
-    def __init__(self):
-        self.init      = S0
-        self.matur     = T_YRS
-        self.volat     = SIGMA
-        self.dividend  = DIV
-        super().__init__(NPER, R)
+    # pylint: disable=too-many-instance-attributes, too-many-arguments
+    def __init__(self, init=None, matur=None, volat=None,
+                 nperiods=None, rate=None, dividend=None):
+        # parameters not passed explicitly default to the module constants
+        self.init      = S0 if init is None else init
+        self.matur     = T_YRS if matur is None else matur
+        self.volat     = SIGMA if volat is None else volat
+        self.dividend  = DIV if dividend is None else dividend
+        super().__init__(NPER if nperiods is None else nperiods,
+                         R if rate is None else rate)
 
         self._set_up_down_rates()
         self._set_risk_neutral_proba()
@@ -88,24 +96,17 @@ class SecurityParameters(lt.Parameters):
 
 
 
-class Shares(lt.Lattice):
-    ''' Shares lattice / subclass of Lattice'''
-    def __init__(self, sec_par):
+class Shares(lt.ClosedFormLattice):
+    ''' Shares lattice / subclass of Lattice
+        lazy=True evaluates the nodes on demand instead of storing them '''
+    def __init__(self, sec_par, lazy=False, path=None):
         self.sec_parameters = sec_par
-        super().__init__(self.sec_parameters.nperiods)
+        super().__init__(self.sec_parameters.nperiods, sec_par.init, sec_par.r_ud, lazy, path)
 
 
     def build(self):
         ''' Build the lattice '''
-        self.lattice[0][0] = self.sec_parameters.init
-        for period in range(1, self.size+1):
-            for state in range(0, period+1):
-                if state == 0:
-                    s_prev = self.lattice[state][period-1]
-                    self.lattice[state][period] = self.sec_parameters.r_ud[1] * s_prev
-                else:
-                    s_prev = self.lattice[state-1][period-1]
-                    self.lattice[state][period] = self.sec_parameters.r_ud[0] * s_prev
+        self._fill()
 
 
 #### OPTION ####
@@ -128,33 +129,74 @@ class OptionParameters(lt.Parameters):
 class Options(lt.Lattice):
     ''' Options lattice / subclass of Lattice
         underlying is lattice of either security or futures '''
-    def __init__(self, opt_par):
+    def __init__(self, opt_par, keep=None, path=None):
         self.option_parameters = opt_par
         self.flags             = [1.0, 'E']
-        super().__init__(opt_par.nperiods)
+        # early-exercise boundary (American options), one entry per period:
+        # critical state index (-1: no exercise) & underlying value there
+        self.boundary_state    = None
+        self.boundary_spot     = None
+        super().__init__(opt_par.nperiods, keep, path)
 
 
     def build(self, underlying, sec_par):
-        ''' build the lattice '''
+        ''' build the lattice by backward induction, one time slice at a time '''
         self._set_option_flags(self.option_parameters)
-
-        for period in range(self.size, -1, -1):
-            for state in range(period, -1, -1):
-                comp = underlying.lattice[state][period] - self.option_parameters.strike
-                if period == self.size:
-                    self.lattice[state][period] = max(self.flags[0]*comp, 0.)
-                else:
-                    num    = self._back_prop(state, period, sec_par.rnp)
-                    denom  = math.exp(sec_par.rate * sec_par.matur/self.size)
-                    ratio  = num/denom
-                    ex_val = -comp # exercise value
-
-                    if self.flags[1] == 'E':
-                        self.lattice[state][period] = ratio
-                    else: # American option
-                        self.lattice[state][period] = max(ex_val, ratio)
-                        if ex_val > ratio:
-                            print(f'Exercizing option {state}/t={period} {ex_val:.2f}>{ratio:.2f}')
+        strike = self.option_parameters.strike
+        denom  = math.exp(sec_par.rate * sec_par.matur/self.size)
+        self.boundary_state = np.full(self.size+1, -1)
+        self.boundary_spot  = np.full(self.size+1, np.nan)
+
+        last, values = self._final_values(underlying, sec_par)
+        for period in range(last-1, -1, -1):
+            if self.flags[1] == 'E':
+                values = self._back_prop_slice(values, sec_par.rnp) / denom
+            else: # American option
+                spot = underlying.time_slice(period)
+                values, exercised = self._american_step(values, spot, strike, sec_par.rnp, denom)
+                self._set_boundary(period, spot, exercised)
+            self._store_slice(period, values)
+
+
+    def _american_step(self, values, spot, strike, rnp, denom):
+        ''' returns (max(exercise, continuation), exercised states) at t
+            from the values at t+1 (kernels.american_step) '''
+        # pylint: disable=too-many-arguments
+        return kn.american_step(values, spot, strike, self.flags[0], rnp[0], rnp[1], denom)
+
+
+    def _final_values(self, underlying, sec_par):
+        ''' stores the payoff at maturity; returns (period, values)
+            where the backward induction starts '''
+        # pylint: disable=unused-argument
+        spot   = underlying.time_slice(self.size)
+        ex_val = self.flags[0]*(spot - self.option_parameters.strike) # exercise value
+        values = np.maximum(ex_val, 0.)
+        self._store_slice(self.size, values)
+        if self.flags[1] == 'A':
+            self._set_boundary(self.size, spot, ex_val > 0.)
+        return self.size, values
+
+
+    def _set_boundary(self, period, spot, exercised):
+        ''' records the critical state of the exercise region at period:
+            highest exercised state for puts, lowest for calls '''
+        states = np.flatnonzero(exercised)
+        if states.size == 0:
+            return
+        state = states[-1] if self.flags[0] < 0 else states[0]
+        self.boundary_state[period] = state
+        self.boundary_spot[period]  = spot[state]
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug('Exercising option t=%d: %d states, critical state %d (S=%.2f)',
+                         period, states.size, state, spot[state])
+
+
+    def exercise_boundary(self):
+        ''' returns (periods, critical states, underlying values) of the
+            early-exercise boundary, for the periods where exercise occurs '''
+        periods = np.flatnonzero(self.boundary_state >= 0)
+        return periods, self.boundary_state[periods], self.boundary_spot[periods]
 
 
     def _set_option_flags(self, opt_par):
@@ -169,23 +211,209 @@ class Options(lt.Lattice):
             raise Exception(f'TYPE should be "european" or "american". Value is: "{opt_par.type}"')
 
 
+#### OPTION CHAIN ####
+class OptionChainParameters(lt.Parameters):
+    '''Encapsulates parameters for a chain of options on the same underlying
+       opt, option_type, strike & nperiods are scalars or one entry per contract'''
+    def __init__(self, opts, option_types, strikes, nperiods):
+        self.strike   = np.atleast_1d(np.asarray(strikes, dtype=float))
+        ncontracts    = self.strike.size
+        self.opt      = np.broadcast_to(np.asarray(opts), ncontracts)
+        self.type     = np.broadcast_to(np.asarray(option_types), ncontracts)
+        self.expiry   = np.broadcast_to(np.asarray(nperiods, dtype=int), ncontracts)
+        self.flag     = np.ones(ncontracts) # 1.0 call / -1.0 put
+        self.american = np.zeros(ncontracts, dtype=bool)
+        for i in range(ncontracts):
+            if str.lower(str(self.opt[i])) == 'put':
+                self.flag[i] = -1.0
+            elif str.lower(str(self.opt[i])) != 'call':
+                raise Exception(f'OPT should be "call" or "put". Value is: "{self.opt[i]}"')
+            if str.lower(str(self.type[i])) == 'american':
+                self.american[i] = True
+            elif str.lower(str(self.type[i])) != 'european':
+                raise Exception(f'TYPE should be "european" or "american". Value is: "{self.type[i]}"')
+        super().__init__(int(self.expiry.max()))
+
+
+    def describe(self):
+        '''Prints summary options parameters to std out'''
+        print(f'Option chain: {self.strike.size} contracts')
+        print(f'Strikes: {self.strike.min()} - {self.strike.max()}')
+        print(f'Expiries: {self.expiry.min()} - {self.expiry.max()} periods')
+
+
+
+class OptionChain():
+    ''' Prices a chain of options against a single Shares or Futures lattice
+        the backward induction runs once for every contract at the same time:
+        values is a (contract x state) array rolled back one period per step '''
+    def __init__(self, chain_par):
+        self.chain_parameters = chain_par
+        self.size             = chain_par.nperiods
+        self.prices           = None
+
+
+    def build(self, underlying, sec_par):
+        ''' price every contract of the chain; results in self.prices '''
+        par = self.chain_parameters
+        if self.size > underlying.size:
+            raise Exception(f'Expiry {self.size} beyond underlying lattice ({underlying.size})')
+        strike   = par.strike[:, None]
+        flag     = par.flag[:, None]
+        # same per-contract discounting as Options: matur/OP_NPER per step
+        denom    = np.exp(sec_par.rate * sec_par.matur / par.expiry)[:, None]
+        american = par.american
+
+        values = np.zeros((strike.shape[0], self.size+1))
+        for period in range(self.size, -1, -1):
+            spot  = underlying.time_slice(period)
+            ratio = values[:, :period+1] # updated in place
+            if period < self.size:
+                upper  = values[:, 1:period+2] * sec_par.rnp[0]
+                ratio *= sec_par.rnp[1]
+                ratio += upper
+                ratio /= denom
+                # contracts not yet alive (expiry < period) are overwritten at expiry
+                alive = (american & (par.expiry > period))[:, None]
+                if alive.any():
+                    np.maximum(flag*(spot - strike), ratio, out=ratio, where=alive)
+            expiring = (par.expiry == period)[:, None]
+            if expiring.any():
+                np.copyto(ratio, np.maximum(flag*(spot - strike), 0.), where=expiring)
+        self.prices = values[:, 0].copy()
+        return self.prices
+
+
+    def describe(self):
+        '''Self-descriptor'''
+        par = self.chain_parameters
+        print('\n*** Option chain prices ***')
+        for i in range(par.strike.size):
+            print(f'{str.capitalize(str(par.type[i]))} {par.opt[i]} K={par.strike[i]} '
+                  f'T={par.expiry[i]}: C0={self.prices[i]:.2f}')
+
+
+#### PARAMETER BATCH ####
+class SecurityParametersBatch(SecurityParameters):
+    '''Vectorized SecurityParameters: init, matur, volat, rate & dividend
+       are arrays broadcast against each other, nperiods is shared
+       u, d & q are computed for every parameter set at once'''
+    # pylint: disable=too-many-arguments
+    def __init__(self, init=None, matur=None, volat=None,
+                 nperiods=None, rate=None, dividend=None):
+        values = [S0 if init is None else init,
+                  T_YRS if matur is None else matur,
+                  SIGMA if volat is None else volat,
+                  R if rate is None else rate,
+                  DIV if dividend is None else dividend]
+        values     = np.broadcast_arrays(*[np.asarray(x, dtype=float) for x in values])
+        self.shape = values[0].shape
+        init, matur, volat, rate, dividend = [x.ravel() for x in values]
+        super().__init__(init, matur, volat, nperiods, rate, dividend)
+
+
+    def _set_up_down_rates(self):
+        ''' Computes u & d=1/u for every parameter set '''
+        exponent  = self.volat * np.sqrt(self.matur / self.nperiods)
+        self.r_ud = [np.exp(exponent), np.exp(-exponent)]
+
+
+    def _set_risk_neutral_proba(self):
+        ''' Computes q & 1-q for every parameter set '''
+        exponent = (self.rate - self.dividend) * self.matur / self.nperiods
+        proba    = (np.exp(exponent) - self.r_ud[1]) / (self.r_ud[0] - self.r_ud[1])
+        self.rnp = [proba, 1.0 - proba]
+
+
+    def describe(self):
+        ''' Prints summary parameters to stdout '''
+        print('*** Security parameters batch ***')
+        print(f'Parameter sets: {self.init.size}')
+        for name, values in (('Initial price', self.init), ('Maturity', self.matur),
+                             ('Volatility', self.volat), ('Risk-free rate', self.rate),
+                             ('Dividend yield', self.dividend)):
+            print(f'{name}: {values.min():.4f} - {values.max():.4f}')
+        print(f'Maturity: {self.nperiods} periods')
+
+
+
+class OptionsBatch():
+    ''' Prices one option per parameter set of a SecurityParametersBatch
+        the share lattices are rolled back together as a
+        (parameter set x state) array: no per-set object or loop
+        sets are processed in blocks to bound the working memory
+        the options expire at the end of the lattice (OP_NPER = NPER) '''
+    def __init__(self, opt_par, block=1024):
+        # opt_par: OptionParameters or OptionChainParameters whose
+        # entries broadcast against the parameter sets
+        self.option_parameters = opt_par
+        self.block             = block
+        self.prices            = None
+
+
+    def build(self, sec_par):
+        ''' price the option for every parameter set; results in self.prices '''
+        par   = self.option_parameters
+        chain = OptionChainParameters(par.opt, par.type, par.strike,
+                                      getattr(par, 'expiry', par.nperiods)) # per contract
+        if not np.all(chain.expiry == sec_par.nperiods): # every contract rolled back from NPER
+            raise Exception(f'OP_NPER ({sorted(set(chain.expiry.tolist()))}) should equal '
+                            f'NPER ({sec_par.nperiods}) for every contract')
+        shape = np.broadcast_shapes(sec_par.init.shape, chain.strike.shape)
+        # one column per input: strike, flag, american, S0, u, d, q, 1-q, discount
+        columns = [chain.strike, chain.flag, chain.american, sec_par.init,
+                   sec_par.r_ud[0], sec_par.r_ud[1], sec_par.rnp[0], sec_par.rnp[1],
+                   np.exp(sec_par.rate * sec_par.matur / sec_par.nperiods)]
+        columns = [np.broadcast_to(x, shape)[:, None] for x in columns]
+
+        prices = np.empty(shape)
+        for first in range(0, prices.size, self.block):
+            block = slice(first, first + self.block)
+            prices[block] = self._build_block(sec_par.nperiods, *[x[block] for x in columns])
+        if prices.size == sec_par.init.size: # keep the shape of the parameter grid
+            prices = prices.reshape(sec_par.shape)
+        self.prices = prices
+        return self.prices
+
+
+    @staticmethod
+    def _build_block(size, strike, flag, amer, init, u_rate, d_rate, q_up, q_down, denom):
+        ''' backward induction for a block of parameter sets '''
+        # pylint: disable=too-many-arguments
+        # S_T = S0 u^state d^(T-state), then S_t = S_(t+1) / d state by state
+        states = np.arange(size+1)
+        spot   = init * u_rate**states * d_rate**(size - states)
+        values = np.maximum(flag*(spot - strike), 0.)
+        for period in range(size-1, -1, -1):
+            spot   = spot[:, :period+1] / d_rate
+            values = (values[:, 1:] * q_up + values[:, :-1] * q_down) / denom
+            if amer.any():
+                np.maximum(flag*(spot - strike), values, out=values, where=amer)
+        return values[:, 0]
+
+
+    def describe(self):
+        '''Self-descriptor'''
+        print('\n*** Option batch prices ***')
+        print(f'{self.prices.size} prices: {self.prices.min():.4f} - {self.prices.max():.4f}')
+
+
 #### FUTURES ####
 class Futures(lt.Lattice):
     ''' Shares lattice / subclass of Lattice'''
-    def __init__(self, sec_par):
+    def __init__(self, sec_par, keep=None, path=None):
         self.sec_par = sec_par
-        super().__init__(sec_par.nperiods)
+        super().__init__(sec_par.nperiods, keep, path)
 
 
     def build(self, underlying):
         ''' build the lattice '''
-        rnp = self.sec_par.rnp
-        for period in range(self.size, -1, -1):
-            for state in range(period, -1, -1):
-                if period == self.size: # F_T = S_T at maturity
-                    self.lattice[state][period] = underlying.lattice[state][period]
-                else:
-                    self.lattice[state][period] = self._back_prop(state, period, rnp)
+        rnp    = self.sec_par.rnp
+        values = underlying.time_slice(self.size) # F_T = S_T at maturity
+        self._store_slice(self.size, values)
+        for period in range(self.size-1, -1, -1):
+            values = self._back_prop_slice(values, rnp)
+            self._store_slice(period, values)
 
 
 
@@ -224,3 +452,8 @@ if __name__ == '__main__':
         options.describe('Option (from futures)', option_params, False)
     else:
         options.describe('Option (from security)', option_params, False)
+
+    if str.lower(TYPE) == 'american': # early-exercise boundary
+        print('\nEarly exercise boundary (period / state / underlying):')
+        for t, i, s_t in zip(*options.exercise_boundary()):
+            print(f'{t:3d} / {i:3d} / {s_t:.2f}')
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 15:40:12 2026
+
+Prices a portfolio of independent trades on a process pool
+
+Each trade is a dictionary with a 'kind' (option, bond, swap, swaption,
+caplet or floorlet) and its parameters; missing parameters default to
+the module constants of options.py, bonds.py & term_structure.py.
+Trades are encoded as rows of float arrays, one array per kind, and
+sharded across a concurrent.futures process pool: only these arrays and
+the price arrays travel between processes, never lattice objects.
+Derivative lattices are built in price-only mode in the workers, on
+lazy shares lattices or on the short-rate lattices of the registry.
+
+@author: charles mégnin
+"""
+import concurrent.futures
+import numpy as np
+import kernels as kn
+import options as op
+import bonds as bd
+import short_rate as sr
+import term_structure as ts
+
+#### PARAMETERS ####
+CHUNK = 256 # trades per shard sent to a worker
+#### END PARAMETERS ####
+
+# trade kind -> encoded fields, in row order
+SHORT_RATE_FIELDS = ('r00', 'r_up', 'r_down', 'q', 'ts_nper')
+FIELDS = {'option':   ('init', 'matur', 'volat', 'nperiods', 'rate', 'dividend',
+                       'strike', 'flag', 'american', 'op_nper'),
+          'bond':     SHORT_RATE_FIELDS + ('face', 'coupon', 'nperiods'),
+          'swap':     SHORT_RATE_FIELDS + ('fixed_rate', 'nperiods'),
+          'swaption': SHORT_RATE_FIELDS + ('fixed_rate', 'swap_nper', 'strike', 'nperiods'),
+          'capfloor': SHORT_RATE_FIELDS + ('flag', 'libor', 'nperiods')}
+
+
+def _defaults(kind):
+    ''' default trade parameters of a kind, read from the module constants '''
+    if kind == 'option':
+        return {'init': op.S0, 'matur': op.T_YRS, 'volat': op.SIGMA, 'nperiods': op.NPER,
+                'rate': op.R, 'dividend': op.DIV, 'strike': op.K, 'opt': op.OPT,
+                'type': op.TYPE}
+    module = bd if kind == 'bond' else ts # bonds.py has its own term structure
+    values = {'r00': module.TS_R00, 'r_up': module.TS_RUD[0], 'r_down': module.TS_RUD[1],
+              'q': module.TS_RNP[0], 'ts_nper': module.TS_NPER}
+    if kind == 'bond':
+        values.update(face=bd.BOND_FACE, coupon=bd.BOND_COUPON, nperiods=bd.BOND_NPER)
+    elif kind == 'swap':
+        values.update(fixed_rate=ts.FIXED_RATE, nperiods=ts.SWAP_NPER)
+    elif kind == 'swaption':
+        values.update(fixed_rate=ts.FIXED_RATE, swap_nper=ts.SWAP_NPER,
+                      strike=ts.SWAPTION_K, nperiods=ts.SWAPTION_NPER)
+    elif kind in ('caplet', 'floorlet'):
+        values.update(libor=ts.LIBOR, nperiods=ts.CF_NPER)
+    else:
+        raise Exception(f'Unknown trade kind: "{kind}"')
+    return values
+
+
+def encode(trade):
+    ''' returns (encoded kind, row of floats) for a trade dictionary '''
+    kind   = str.lower(trade['kind'])
+    values = _defaults(kind)
+    values.update({key: value for key, value in trade.items() if key != 'kind'})
+    if kind == 'option': # validated like Options._set_option_flags
+        opt, option_type = str.lower(str(values['opt'])), str.lower(str(values['type']))
+        if opt not in ('call', 'put'):
+            raise Exception(f'OPT should be "call" or "put". Value is: "{values["opt"]}"')
+        if option_type not in ('european', 'american'):
+            raise Exception(f'TYPE should be "european" or "american". Value is: "{values["type"]}"')
+        values['flag']     = -1.0 if opt == 'put' else 1.0
+        values['american'] = 1.0 if option_type == 'american' else 0.0
+        values.setdefault('op_nper', values['nperiods'])
+    elif kind in ('caplet', 'floorlet'):
+        values['flag'] = 1.0 if kind == 'caplet' else -1.0
+        kind = 'capfloor'
+    return kind, [float(values[field]) for field in FIELDS[kind]]
+
+
+def _short_rate(row):
+    ''' short-rate lattice & its parameters from an encoded row
+        trades on the same curve share the lazy lattice of the worker's
+        registry: O(N) memory per curve '''
+    term_params = sr.TermStructureParameters(row['r00'], [row['r_up'], row['r_down']],
+                                             [row['q'], 1.0 - row['q']], int(row['ts_nper']))
+    return term_params, sr.REGISTRY.short_rate(term_params, lazy=True)
+
+
+def _price_row(kind, row):
+    ''' prices one encoded trade '''
+    row = dict(zip(FIELDS[kind], row))
+    if kind == 'option':
+        sec_par = op.SecurityParameters(row['init'], row['matur'], row['volat'],
+                                        int(row['nperiods']), row['rate'], row['dividend'])
+        opt_par = op.OptionParameters('put' if row['flag'] < 0 else 'call',
+                                      'american' if row['american'] else 'european',
+                                      row['strike'], int(row['op_nper']))
+        derivative = op.Options(opt_par, keep=1)
+        derivative.build(op.Shares(sec_par, lazy=True), sec_par)
+        return derivative.present_value()
+
+    term_params, short_rates = _short_rate(row)
+    if kind == 'bond':
+        derivative = bd.Bond(bd.BondParameters(row['face'], row['coupon'], int(row['nperiods'])),
+                             keep=1)
+        derivative.build(term_params, short_rates)
+    elif kind == 'swap':
+        derivative = ts.Swap(ts.SwapParameters(int(row['nperiods']), row['fixed_rate']), keep=1)
+        derivative.build(term_params, short_rates)
+    elif kind == 'swaption':
+        expiry = int(row['nperiods'])
+        swap   = ts.Swap(ts.SwapParameters(int(row['swap_nper']), row['fixed_rate']),
+                         keep=expiry+1)
+        swap.build(term_params, short_rates)
+        derivative = ts.Swaption(ts.SwaptionParameters(expiry, row['strike']), keep=1)
+        derivative.build(term_params, short_rates, swap)
+    else:
+        cf_type    = 'caplet' if row['flag'] > 0 else 'floorlet'
+        derivative = ts.CapFloorLet(ts.CFParameters(cf_type, int(row['nperiods']), row['libor']),
+                                    keep=1)
+        derivative.build(term_params, short_rates)
+    return derivative.present_value()
+
+
+def price_shard(kind, rows):
+    ''' worker entry point: prices a (trades x fields) array of one kind '''
+    return np.array([_price_row(kind, row) for row in rows], dtype=float)
+
+
+
+def worker_pool(workers=None):
+    ''' process pool whose workers select the kernel backend of this
+        process and compile it before their first trade '''
+    return concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=kn.use,
+                                                  initargs=(kn.ACTIVE,))
+
+
+
+class Portfolio():
+    ''' Independent trades priced in parallel; prices are returned in input order '''
+
+    def __init__(self, trades):
+        self.trades = trades
+        self.prices = None
+        # kind -> (trade indices, encoded rows)
+        self.shards = {}
+        encoded = {}
+        for index, trade in enumerate(trades):
+            kind, row = encode(trade)
+            encoded.setdefault(kind, ([], []))
+            encoded[kind][0].append(index)
+            encoded[kind][1].append(row)
+        for kind, (indices, rows) in encoded.items():
+            self.shards[kind] = (np.array(indices), np.array(rows, dtype=float))
+
+
+    def _chunks(self, chunk):
+        ''' yields (kind, trade indices, rows) shards of at most chunk trades '''
+        for kind, (indices, rows) in self.shards.items():
+            for first in range(0, len(indices), chunk):
+                yield kind, indices[first:first+chunk], rows[first:first+chunk]
+
+
+    def price(self, workers=None, chunk=CHUNK, executor=None):
+        ''' prices all trades; workers=None uses every core,
+            workers=0 prices in the calling process
+            executor: an open pool to reuse across portfolios (see worker_pool) '''
+        self.prices = np.empty(len(self.trades))
+        if workers == 0 and executor is None:
+            for kind, indices, rows in self._chunks(chunk):
+                self.prices[indices] = price_shard(kind, rows)
+            return self.prices
+
+        if executor is None:
+            with worker_pool(workers) as pool:
+                return self.price(chunk=chunk, executor=pool)
+        pending = {executor.submit(price_shard, kind, rows): indices
+                   for kind, indices, rows in self._chunks(chunk)}
+        for future in concurrent.futures.as_completed(pending):
+            self.prices[pending[future]] = future.result()
+        return self.prices
+
+
+    def describe(self):
+        '''Self-descriptor'''
+        print('\n*** Portfolio ***')
+        for kind, (indices, _) in self.shards.items():
+            print(f'{kind}: {len(indices)} trades, value {self.prices[indices].sum():.4f}')
+        print(f'Total: {len(self.trades)} trades, value {self.prices.sum():.4f}')
+
+
+
+if __name__ == '__main__':
+    book = [{'kind': 'option', 'strike': strike, 'opt': opt}
+            for strike in np.linspace(80., 120., 50) for opt in ('call', 'put')]
+    book += [{'kind': 'bond', 'coupon': coupon}
+             for coupon in np.linspace(0., .1, 20)]
+    book += [{'kind': 'swap', 'fixed_rate': rate} for rate in np.linspace(.03, .07, 20)]
+    book += [{'kind': 'swaption', 'fixed_rate': .05}]
+    book += [{'kind': 'caplet'}, {'kind': 'floorlet'}]
+
+    portfolio = Portfolio(book)
+    portfolio.price()
+    portfolio.describe()
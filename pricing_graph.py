@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 23:02:45 2026
+
+Incremental re-pricing of lattice chains with a dependency graph
+
+The graph has two kinds of nodes:
+    inputs: parameters objects, replaced with PricingGraph.update()
+    lattices: built from the values of their parents (inputs & lattices)
+Updating an input marks every node downstream of it dirty. Lattices are
+rebuilt lazily by get(), and only the dirty ones: upstream lattices
+whose inputs did not change are reused as they are.
+
+Standard chains:
+    option_graph:   security -> Shares -> [Futures] -> Options
+    swaption_graph: term structure -> ShortRate -> Swap -> Swaption
+    bond_graph:     term structure -> ShortRate -> Bond -> BondFF / ZCBOptions
+e.g. changing the option's nperiods or the swaption expiry only rebuilds
+the options or the swaption lattice.
+
+@author: charles mégnin
+"""
+import options as op
+import bonds as bd
+import short_rate as sr
+import term_structure as ts
+
+
+class Node():
+    ''' one node of the graph
+        build=None for an input, else build(*parent values) returns the value '''
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, name, value=None, build=None, parents=()):
+        self.name     = name
+        self.value    = value
+        self.build    = build
+        self.parents  = tuple(parents)
+        self.children = []
+        self.dirty    = build is not None # lattices are built on first use
+        self.builds   = 0
+
+
+
+class PricingGraph():
+    ''' Dependency graph of parameters & lattices with dirty flags '''
+
+    def __init__(self):
+        self.nodes = {}
+
+
+    def _add(self, node):
+        if node.name in self.nodes:
+            raise Exception(f'Node "{node.name}" already in the graph')
+        for parent in node.parents:
+            if parent not in self.nodes:
+                raise Exception(f'Unknown parent "{parent}" of node "{node.name}"')
+            self.nodes[parent].children.append(node.name)
+        self.nodes[node.name] = node
+        return node
+
+
+    def _node(self, name):
+        if name not in self.nodes:
+            raise Exception(f'Unknown node "{name}"')
+        return self.nodes[name]
+
+
+    def add_input(self, name, parameters):
+        ''' adds a parameters object '''
+        return self._add(Node(name, parameters))
+
+
+    def add_lattice(self, name, build, parents):
+        ''' adds a lattice returned by build(*values of parents) '''
+        return self._add(Node(name, build=build, parents=parents))
+
+
+    def invalidate(self, name):
+        ''' marks the lattices downstream of name dirty
+            (and name itself if it is a lattice) '''
+        pending = [name]
+        while pending:
+            node = self._node(pending.pop())
+            if node.build is not None:
+                node.dirty = True
+            pending.extend(node.children)
+
+
+    def update(self, name, parameters):
+        ''' replaces the parameters of input name; its downstream lattices
+            are rebuilt on their next get() '''
+        node = self._node(name)
+        if node.build is not None:
+            raise Exception(f'"{name}" is a lattice, not an input')
+        if parameters is node.value:
+            return
+        node.value = parameters
+        self.invalidate(name)
+
+
+    def get(self, name):
+        ''' returns the value of name, rebuilding the dirty lattices it depends on '''
+        node = self._node(name)
+        if node.dirty:
+            values = [self.get(parent) for parent in node.parents]
+            node.value  = node.build(*values)
+            node.dirty  = False
+            node.builds += 1
+        return node.value
+
+
+    def dirty(self):
+        ''' names of the lattices to rebuild '''
+        return [name for name, node in self.nodes.items() if node.dirty]
+
+
+    def describe(self):
+        '''Self-descriptor'''
+        print('\n*** Pricing graph ***')
+        for name, node in self.nodes.items():
+            if node.build is None:
+                print(f'{name:12s} input')
+            else:
+                state = 'dirty' if node.dirty else 'clean'
+                print(f'{name:12s} <- {", ".join(node.parents):32s} {state:5s} '
+                      f'{node.builds} build(s)')
+
+
+
+def _built(lattice, *args):
+    ''' builds lattice from args & returns it '''
+    lattice.build(*args)
+    return lattice
+
+
+def option_graph(sec_par, opt_par, futures=False):
+    ''' security -> shares -> [futures] -> options
+        inputs 'security' & 'option', lattices 'shares', 'futures' & 'options' '''
+    graph = PricingGraph()
+    graph.add_input('security', sec_par)
+    graph.add_input('option', opt_par)
+    graph.add_lattice('shares', lambda sec: _built(op.Shares(sec)), ['security'])
+    underlying = 'shares'
+    if futures:
+        graph.add_lattice('futures', lambda sec, shares: _built(op.Futures(sec), shares),
+                          ['security', 'shares'])
+        underlying = 'futures'
+    graph.add_lattice('options', lambda opt, sec, under: _built(op.Options(opt), under, sec),
+                      ['option', 'security', underlying])
+    return graph
+
+
+def _short_rate_graph(ts_par):
+    ''' term structure -> short rate (shared through the registry) '''
+    graph = PricingGraph()
+    graph.add_input('term', ts_par)
+    graph.add_lattice('short_rate', sr.REGISTRY.short_rate, ['term'])
+    return graph
+
+
+def swaption_graph(ts_par, swap_par, swaption_par):
+    ''' term structure -> short rate -> swap -> swaption
+        inputs 'term', 'swap_par' & 'swaption_par' '''
+    graph = _short_rate_graph(ts_par)
+    graph.add_input('swap_par', swap_par)
+    graph.add_input('swaption_par', swaption_par)
+    graph.add_lattice('swap', lambda par, term, rates: _built(ts.Swap(par), term, rates),
+                      ['swap_par', 'term', 'short_rate'])
+    graph.add_lattice('swaption',
+                      lambda par, term, rates, swap: _built(ts.Swaption(par), term, rates, swap),
+                      ['swaption_par', 'term', 'short_rate', 'swap'])
+    return graph
+
+
+def bond_graph(ts_par, bond_par, ff_par=None, zcb_opt_par=None):
+    ''' term structure -> short rate -> bond -> bond forward/future & bond option
+        inputs 'term', 'bond_par', 'ff_par' & 'zcb_opt_par' '''
+    graph = _short_rate_graph(ts_par)
+    graph.add_input('bond_par', bond_par)
+    graph.add_lattice('bond', lambda par, term, rates: _built(bd.Bond(par), term, rates),
+                      ['bond_par', 'term', 'short_rate'])
+    if ff_par is not None:
+        graph.add_input('ff_par', ff_par)
+        graph.add_lattice('bond_ff',
+                          lambda par, term, rates, bond: _built(bd.BondFF(par), term, rates, bond),
+                          ['ff_par', 'term', 'short_rate', 'bond'])
+    if zcb_opt_par is not None:
+        graph.add_input('zcb_opt_par', zcb_opt_par)
+        graph.add_lattice('zcb_options',
+                          lambda par, bond, rates: _built(bd.ZCBOptions(par), bond, rates),
+                          ['zcb_opt_par', 'bond', 'short_rate'])
+    return graph
+
+
+
+if __name__ == '__main__':
+    # what-if on the option: only the options lattice is rebuilt
+    security_params = op.SecurityParameters()
+    pricing = option_graph(security_params, op.OptionParameters(op.OPT, op.TYPE, op.K, op.OP_NPER),
+                           futures=True)
+    print(f"C0={pricing.get('options').present_value():.4f}")
+    for strike in (90., 110.):
+        pricing.update('option', op.OptionParameters(op.OPT, op.TYPE, strike, op.OP_NPER))
+        print(f"K={strike}: C0={pricing.get('options').present_value():.4f}")
+    pricing.describe()
+
+    # what-if on the swaption expiry: the short rates & swap are reused
+    term_params = ts.TermStructureParameters()
+    pricing = swaption_graph(term_params, ts.SwapParameters(ts.SWAP_NPER, ts.FIXED_RATE),
+                             ts.SwaptionParameters(ts.SWAPTION_NPER, ts.SWAPTION_K))
+    print(f"Swaption: {pricing.get('swaption').present_value():.6f}")
+    pricing.update('swaption_par', ts.SwaptionParameters(ts.SWAPTION_NPER - 1, ts.SWAPTION_K))
+    print(f"Swaption (expiry {ts.SWAPTION_NPER - 1}): {pricing.get('swaption').present_value():.6f}")
+    pricing.describe()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 16:31:07 2026
+
+Short-rate lattice shared by bonds.py & term_structure.py
+and a registry caching built short-rate & elementary price lattices
+
+Instruments priced on the same curve share one lattice: the registry
+keys lattices by (init, r_ud, rnp, nperiods) and evicts the least
+recently used ones beyond its size, in lattices or in stored bytes.
+
+@author: charles mégnin
+"""
+from collections import OrderedDict
+import lattice as lt
+import instrumentation as ins
+
+#### PARAMETERS ####
+REGISTRY_SIZE  = 32 # lattices kept by the registry
+REGISTRY_BYTES = 256 * 2**20 # stored bytes kept by the registry (O(N) per lazy lattice)
+#### END PARAMETERS ####
+
+
+### SHORT RATE LATTICE ###
+class TermStructureParameters(lt.Parameters):
+    ''' Encapsulates parameters for the underlying security
+        Base parameters for all fixed income derivatives
+    '''
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, init, r_ud, rnp, nperiods):
+        self.init  = init
+        self.r_ud  = r_ud
+        self.rnp   = rnp
+        super().__init__(nperiods)
+
+
+    def describe(self):
+        ''' Prints summary parameters to stdout '''
+        print(f'Initial price: {self.init:.2%}')
+        print(f'Up-down rate: {self.r_ud}')
+        print(f'Risk-neutral probability: {self.rnp}')
+        super().describe()
+
+
+
+class ShortRate(lt.ClosedFormLattice):
+    ''' Short rate lattice: base lattice for all fixed-income derivatives
+        lazy=True evaluates the rates on demand instead of storing them '''
+
+    def __init__(self, term_structure_parameters, lazy=False, path=None):
+        self.parameters = term_structure_parameters
+        super().__init__(self.parameters.nperiods, self.parameters.init,
+                         self.parameters.r_ud, lazy, path)
+        self._build() # auto-build
+
+
+    def _build(self): # build the lattice
+        self._fill()
+
+
+    def describe(self):
+        '''Self-descriptor'''
+        super().describe('Interest rate term structure', self.parameters, True)
+
+
+
+### REGISTRY ###
+class ShortRateRegistry():
+    ''' LRU cache of built ShortRate & ElementaryPrices lattices '''
+
+    def __init__(self, maxsize=REGISTRY_SIZE, maxbytes=REGISTRY_BYTES):
+        self.maxsize   = maxsize
+        self.maxbytes  = maxbytes
+        self.lattices  = OrderedDict()
+        self.bytes     = 0 # stored_bytes() of the cached lattices
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+
+
+    @staticmethod
+    def key(ts_par):
+        ''' hashable key of a term structure: (init, r_ud, rnp, nperiods) '''
+        return (float(ts_par.init), tuple(float(x) for x in ts_par.r_ud),
+                tuple(float(x) for x in ts_par.rnp), int(ts_par.nperiods))
+
+
+    def _lookup(self, key, builder):
+        ''' returns the cached lattice for key, built by builder() on a miss '''
+        if key in self.lattices:
+            self.hits += 1
+            self.lattices.move_to_end(key)
+            return self.lattices[key]
+        self.misses += 1
+        lattice = builder()
+        self.lattices[key] = lattice
+        self.bytes += lattice.stored_bytes()
+        # the lattice just built is kept even if it alone exceeds maxbytes
+        while len(self.lattices) > 1 and (len(self.lattices) > self.maxsize
+                                          or self.bytes > self.maxbytes):
+            _, evicted = self.lattices.popitem(last=False)
+            self.bytes -= evicted.stored_bytes()
+            self.evictions += 1
+        return lattice
+
+
+    def short_rate(self, ts_par, lazy=False):
+        ''' returns the short-rate lattice of ts_par '''
+        return self._lookup(('short_rate', lazy) + self.key(ts_par),
+                            lambda: ShortRate(ts_par, lazy))
+
+
+    def elementary_prices(self, ts_par, elem_par):
+        ''' returns the elementary price lattice of ts_par up to elem_par.nperiods '''
+        import term_structure as ts # pylint: disable=import-outside-toplevel
+        def builder():
+            elementary = ts.ElementaryPrices(elem_par)
+            elementary.build(ts_par, self.short_rate(ts_par))
+            return elementary
+        key = ('elementary', elem_par.nperiods, elem_par.base) + self.key(ts_par)
+        return self._lookup(key, builder)
+
+
+    def clear(self):
+        ''' empties the registry & resets the counters '''
+        self.lattices.clear()
+        self.hits = self.misses = self.evictions = self.bytes = 0
+
+
+    def describe(self):
+        '''Self-descriptor'''
+        print(f'Short-rate registry: {len(self.lattices)}/{self.maxsize} lattices, '
+              f'{self.bytes/2**20:.1f}/{self.maxbytes/2**20:.1f} MiB, '
+              f'{self.hits} hits / {self.misses} misses / {self.evictions} evictions')
+
+
+
+REGISTRY = ShortRateRegistry() # process-wide registry used by the pricers
+ins.register_cache('short_rate', REGISTRY)
@@ -13,7 +13,10 @@ https://www.coursera.org/learn/financial-engineering-1/home/welcome
 
 @author: charles mégnin
 """
+import numpy as np
 import lattice as lt
+import kernels as kn
+import short_rate as sr
 
 #### PARAMETERS ####
 # Lattice parameters:
@@ -29,66 +32,129 @@ FIXED_RATE   = .05
 SWAP_NPER    = 6
 
 #SWAPTION PARAMETERS
-SWAPTION_K    = .00
-SWAPTION_NPER = 3
+SWAPTION_K        = .00
+SWAPTION_NPER     = 3
+BERMUDAN_EXERCISE = [1, 2, 3] # exercise periods of Bermudan swaptions (None: American)
 
 # CAPLETS/FLOORLETS PARAMETERS
-LIBOR      = .02
-CF_NPER    = 6
+LIBOR       = .02
+CF_NPER     = 6
+CAP_STRIKES = [.02, .05, .08, .11] # caps/floors: one contract per strike
 
 # ELEMENTARY PRICE PARAMETERS
 ELEM_NPER       = 6
 ELEM_BASE_PRICE = 100
 
+# CALIBRATION PARAMETERS
+CAL_SPOT_RATES = [.073, .0762, .081, .0845, .092, .0964, .1012, .1045, .1075, .1122]
+CAL_VOLAT      = .005 # b
+CAL_MODEL      = 'ho-lee' # bdt or ho-lee
+
 ### Derivative selection to be set in main driver ###
 
 ### SHORT RATE LATTICE ###
-class TermStructureParameters(lt.Parameters):
-    ''' Encapsulates parameters for the underlying security
-        Base parameters for all fixed income derivatives
-    '''
+class TermStructureParameters(sr.TermStructureParameters):
+    ''' Term structure parameters defaulting to the constants of this module '''
     # pylint: disable=too-few-public-methods
 
-    def __init__(self):
-        self.init  = TS_R00
-        self.r_ud  = TS_RUD
-        self.rnp   = TS_RNP
-        super().__init__(TS_NPER)
+    def __init__(self, init=None, r_ud=None, rnp=None, nperiods=None):
+        super().__init__(TS_R00 if init is None else init,
+                         TS_RUD if r_ud is None else r_ud,
+                         TS_RNP if rnp is None else rnp,
+                         TS_NPER if nperiods is None else nperiods)
+
+
+
+ShortRate = sr.ShortRate
+
+
+
+### CALIBRATED SHORT RATE LATTICE ###
+class CalibrationParameters(lt.Parameters):
+    ''' Observed zero curve & volatility for a calibrated short-rate lattice
+        spot_rates[t]: per-period spot rate s_(t+1) of the ZCB maturing at t+1
+                       i.e. price 1/(1+s_(t+1))^(t+1)
+        model: 'bdt' (Black-Derman-Toy) r_(t,i) = a_t exp(b i)
+               'ho-lee'                 r_(t,i) = a_t + b i
+        volat: b, scalar or one value per period '''
+
+    def __init__(self, spot_rates, volat, model='bdt', rnp=None):
+        self.spot_rates = np.asarray(spot_rates, dtype=float)
+        if str.lower(model) not in ('bdt', 'ho-lee'):
+            raise Exception(f'model should be "bdt" or "ho-lee". Value is: "{model}"')
+        self.model = str.lower(model)
+        self.volat = np.broadcast_to(np.asarray(volat, dtype=float), self.spot_rates.shape)
+        self.rnp   = TS_RNP if rnp is None else rnp
+        self.init  = self.spot_rates[0] # r_00 = s_1
+        maturities = np.arange(1, self.spot_rates.size+1)
+        self.zcb   = (1. + self.spot_rates)**-maturities # market ZCB prices
+        super().__init__(self.spot_rates.size-1) # short rates for t=0..n-1
 
 
     def describe(self):
         ''' Prints summary parameters to stdout '''
-        print(f'Initial price: {self.init:.2%}')
-        print(f'Up-down rate: {self.r_ud}')
+        print(f'Calibrated {self.model} short-rate lattice')
+        print(f'Spot rates: {self.spot_rates[0]:.2%} - {self.spot_rates[-1]:.2%}')
         print(f'Risk-neutral probability: {self.rnp}')
         super().describe()
 
 
 
-class ShortRate(lt.Lattice):
-    ''' Short rate lattice: base lattice for all fixed-income derivatives '''
+class CalibratedShortRate(lt.Lattice):
+    ''' Short rate lattice fitted period by period to a zero curve
+        the drift a_t of each period is solved (Newton) so that the
+        elementary prices of period t reprice the ZCB maturing at t+1;
+        elementary prices are then carried forward one period only,
+        so the calibration is a single O(N^2) forward pass
+        usable wherever a ShortRate lattice is expected '''
 
-    def __init__(self, term_structure_parameters):
-        self.parameters = term_structure_parameters
+    def __init__(self, cal_parameters, tol=1e-14, max_iter=50):
+        self.parameters = cal_parameters
+        self.tol        = tol
+        self.max_iter   = max_iter
+        self.drift      = np.zeros(cal_parameters.nperiods+1) # a_t
+        self.iterations = 0 # total Newton iterations
         super().__init__(self.parameters.nperiods)
         self._build() # auto-build
 
 
-    def _build(self): # build the lattice
-        self.lattice[0][0] = self.parameters.init
-        for period in range(1, self.size+1):
-            for state in range(0, period+1):
-                if state == 0:
-                    s_prev = self.lattice[state][period-1]
-                    self.lattice[state][period] = self.parameters.r_ud[1] * s_prev
-                else:
-                    s_prev = self.lattice[state-1][period-1]
-                    self.lattice[state][period] = self.parameters.r_ud[0] * s_prev
+    def _shape(self, period):
+        ''' r_(t,i) = a_t * shape_i (bdt) or a_t + shape_i (ho-lee) '''
+        shape = self.parameters.volat[period] * np.arange(period+1)
+        return np.exp(shape) if self.parameters.model == 'bdt' else shape
+
+
+    def _build(self):
+        ''' calibrates & stores the lattice '''
+        par    = self.parameters
+        bdt    = par.model == 'bdt'
+        prices = np.ones(1) # elementary prices at t=0
+        drift  = par.init
+        for period in range(self.size+1):
+            shape = self._shape(period)
+            slope = shape if bdt else 1. # d r_(t,i) / d a_t
+            error = np.inf
+            for _ in range(self.max_iter): # Newton on sum_i P_(t,i)/(1+r_(t,i)) = ZCB_(t+1)
+                self.iterations += 1
+                rates    = drift * shape if bdt else drift + shape
+                discount = prices / (1. + rates)
+                error    = discount.sum() - par.zcb[period]
+                if abs(error) <= self.tol * par.zcb[period]:
+                    break
+                drift += error / np.dot(discount * slope, 1. / (1. + rates))
+            else:
+                raise Exception(f'Calibration of period {period} did not converge in '
+                                f'{self.max_iter} iterations (relative error '
+                                f'{abs(error) / par.zcb[period]:.2e}, tol={self.tol})')
+            rates = drift * shape if bdt else drift + shape # rates of the stored drift
+            self.drift[period] = drift
+            self._store_slice(period, rates)
+            prices = self._forward_prop_slice(prices, rates, par.rnp)
 
 
     def describe(self):
         '''Self-descriptor'''
-        super().describe('Interest rate term structure', self.parameters, True)
+        super().describe('Calibrated interest rate term structure', self.parameters, True)
 
 
 
@@ -110,12 +176,12 @@ class CFParameters(lt.Parameters):
 class CapFloorLet(lt.Lattice):
     ''' Caplets & Floorlets '''
 
-    def __init__(self, cf_parameters):
+    def __init__(self, cf_parameters, keep=None, path=None):
         self.parameters = cf_parameters
         self.nperiods   = self.parameters.nperiods
         self.rate       = self.parameters.rate
-        self.type       = DERIVATIVE
-        super().__init__(self.nperiods)
+        self.type       = self.parameters.type
+        super().__init__(self.nperiods, keep, path)
         self._set_option_flags()
         self.size -= 1 # arrears
 
@@ -130,20 +196,18 @@ class CapFloorLet(lt.Lattice):
             raise Exception(f'DERIVATIVE should be "caplet" or "floorlet". Value is: "{self.type}"')
 
 
-    def build(self, ts_par, sh_rate):
+    def build(self, ts_par, sh_rate=None):
         ''' build the caplet/floorlet lattice '''
-        flag = self.flag # caplet or floorlet
-        rate = self.rate
-        for period in range(self.size, -1, -1):
-            for state in range(period, -1, -1):
-                if period == self.size:
-                    num   = flag*(sh_rate.lattice[state][period] - rate)
-                    denom = 1 + sh_rate.lattice[state][period]
-                    self.lattice[state][period] = num / denom
-                else: # discount rate
-                    num   = self._back_prop(state, period, ts_par.rnp)
-                    denom = 1.0 + sh_rate.lattice[state][period]
-                    self.lattice[state][period] = num / denom
+        if sh_rate is None: # shared curve
+            sh_rate = sr.REGISTRY.short_rate(ts_par)
+        flag   = self.flag # caplet or floorlet
+        rates  = sh_rate.time_slice(self.size)
+        values = flag*(rates - self.rate) / (1 + rates)
+        self._store_slice(self.size, values)
+        for period in range(self.size-1, -1, -1): # discount rate
+            num    = self._back_prop_slice(values, ts_par.rnp)
+            values = num / (1.0 + sh_rate.time_slice(period))
+            self._store_slice(period, values)
 
 
     def describe(self):
@@ -152,6 +216,64 @@ class CapFloorLet(lt.Lattice):
 
 
 
+class CapFloorParameters(lt.Parameters):
+    '''Parameters for caps/floors: a strip of caplets/floorlets paid in
+       arrears at t=1..cf_nper, one contract per strike (scalar or vector)'''
+    def __init__(self, derivative, cf_nper, strikes):
+        self.type   = str.lower(derivative)
+        if self.type not in ('cap', 'floor'):
+            raise Exception(f'DERIVATIVE should be "cap" or "floor". Value is: "{derivative}"')
+        self.flag   = 1.0 if self.type == 'cap' else -1.0
+        self.strike = np.atleast_1d(np.asarray(strikes, dtype=float))
+        super().__init__(cf_nper)
+
+
+    def describe(self):
+        ''' Prints summary parameters to stdout '''
+        print(f'Derivative: {self.type}, {self.nperiods} {self.type}lets')
+        print(f'Strikes: {self.strike.min()} - {self.strike.max()} ({self.strike.size} contracts)')
+
+
+
+class CapFloor():
+    ''' Caps & floors for a vector of strikes in one backward sweep
+        values is a (strike x state) array: at each period t the strip is
+        discounted, then the payment of the caplet fixed at t is added:
+        max(flag*(r_t - K), 0) / (1 + r_t)
+        (CapFloorLet values the payment flag*(r_t - K) / (1 + r_t) without floor) '''
+    def __init__(self, cf_parameters):
+        self.parameters = cf_parameters
+        self.size       = cf_parameters.nperiods - 1 # arrears: last fixing at N-1
+        self.prices     = None
+
+
+    def build(self, ts_par, sh_rate=None):
+        ''' price the cap/floor for every strike; results in self.prices '''
+        if sh_rate is None: # shared curve
+            sh_rate = sr.REGISTRY.short_rate(ts_par)
+        if self.size > sh_rate.size:
+            raise Exception(f'Last fixing {self.size} beyond short-rate lattice ({sh_rate.size})')
+        strike = self.parameters.strike[:, None]
+        flag   = self.parameters.flag
+        values = np.zeros((strike.shape[0], self.size+1))
+        for period in range(self.size, -1, -1):
+            rates = sh_rate.time_slice(period)
+            if period < self.size:
+                values = lt.Lattice._back_prop_slice(values, ts_par.rnp) # pylint: disable=protected-access
+            values += np.maximum(flag*(rates - strike), 0.)
+            values /= 1.0 + rates
+        self.prices = values[:, 0].copy()
+        return self.prices
+
+
+    def describe(self):
+        '''Self-descriptor'''
+        print(f'\n*** {str.capitalize(self.parameters.type)} prices ***')
+        for strike, price in zip(self.parameters.strike, self.prices):
+            print(f'K={strike}: {price:.6f}')
+
+
+
 #### SWAPS ####
 class SwapParameters(lt.Parameters):
     '''Encapsulates parameters for swaps'''
@@ -168,25 +290,23 @@ class SwapParameters(lt.Parameters):
 
 class Swap(lt.Lattice):
     '''Swap lattice '''
-    def __init__(self, swap_par):
+    def __init__(self, swap_par, keep=None, path=None):
         self.parameters = swap_par
-        super().__init__(self.parameters.nperiods)
+        super().__init__(self.parameters.nperiods, keep, path)
         self.size -= 1 # arrears
 
 
-    def build(self, ts_par, sh_rate):
+    def build(self, ts_par, sh_rate=None):
         '''Build the swap lattice'''
-        for period in range(self.size, -1, -1):
-            for state in range(period, -1, -1):
-                if period == self.size:
-                    num  = sh_rate.lattice[state][period] - self.parameters.rate
-                    denom = 1.0 + sh_rate.lattice[state][period]
-                    self.lattice[state][period] = num / denom
-                else:
-                    num  = sh_rate.lattice[state][period] - self.parameters.rate # coupon
-                    num += self._back_prop(state, period, ts_par.rnp)
-                    denom = 1.0 + sh_rate.lattice[state][period]
-                    self.lattice[state][period] = num / denom
+        if sh_rate is None: # shared curve
+            sh_rate = sr.REGISTRY.short_rate(ts_par)
+        rates  = sh_rate.time_slice(self.size)
+        values = (rates - self.parameters.rate) / (1.0 + rates)
+        self._store_slice(self.size, values)
+        for period in range(self.size-1, -1, -1):
+            values = kn.swap_step(values, sh_rate.time_slice(period),
+                                  ts_par.rnp[0], ts_par.rnp[1], self.parameters.rate)
+            self._store_slice(period, values)
 
 
     def describe(self):
@@ -214,21 +334,21 @@ class SwaptionParameters(lt.Parameters):
 class Swaption(lt.Lattice):
     '''Swaption lattice '''
 
-    def __init__(self, swaption_pars):
+    def __init__(self, swaption_pars, keep=None, path=None):
         self.parameters = swaption_pars
-        super().__init__(self.parameters.nperiods)
+        super().__init__(self.parameters.nperiods, keep, path)
 
 
     def build(self, ts_pars, sh_rate, swapl):
         '''Build the swaption lattice'''
-        for period in range(self.size, -1, -1):
-            for state in range(period, -1, -1):
-                if period == self.size:
-                    self.lattice[state][period] = max(0, swapl.lattice[state][period])
-                else: # discount rate
-                    num   = self._back_prop(state, period, ts_pars.rnp)
-                    denom = 1.0 + sh_rate.lattice[state][period]
-                    self.lattice[state][period] = num / denom
+        if sh_rate is None: # shared curve
+            sh_rate = sr.REGISTRY.short_rate(ts_pars)
+        values = np.maximum(swapl.time_slice(self.size), 0.)
+        self._store_slice(self.size, values)
+        for period in range(self.size-1, -1, -1): # discount rate
+            num    = self._back_prop_slice(values, ts_pars.rnp)
+            values = num / (1.0 + sh_rate.time_slice(period))
+            self._store_slice(period, values)
 
 
     def describe(self):
@@ -236,6 +356,74 @@ class Swaption(lt.Lattice):
         super().describe('Swaption', self.parameters, True)
 
 
+
+class BermudanSwaptionParameters(lt.Parameters):
+    '''Encapsulates parameters for Bermudan & American swaptions
+       the option to enter, at any of the exercise periods t, the swap
+       fixed at t..swap_nper-1 (paid in arrears) at fixed_rate
+       exercise: periods (exercise=None: every period, American)
+       side: payer (pays fixed) or receiver (receives fixed)'''
+
+    def __init__(self, swap_nper, fixed_rate, exercise=None, side='payer'):
+        if str.lower(side) not in ('payer', 'receiver'):
+            raise Exception(f'side should be "payer" or "receiver". Value is: "{side}"')
+        self.side     = str.lower(side)
+        self.flag     = 1.0 if self.side == 'payer' else -1.0
+        exercise      = range(swap_nper) if exercise is None else exercise
+        self.exercise = np.unique(np.asarray(exercise, dtype=int))
+        if self.exercise.size == 0 or self.exercise[0] < 0 or self.exercise[-1] >= swap_nper:
+            raise Exception(f'Exercise periods should be in 0..{swap_nper-1}. Value is: {exercise}')
+        super().__init__(swap_nper, fixed_rate)
+
+
+    def describe(self, percent=False, rate=None):
+        ''' Prints summary parameters to stdout '''
+        print(f'{str.capitalize(self.side)} swaption, exercise periods: {self.exercise.tolist()}')
+        super().describe(True, 'Fixed')
+
+
+
+class BermudanSwaption(lt.Lattice):
+    '''Bermudan & American swaptions
+       the swap & the swaption are rolled back together as a (2 x state)
+       array in one backward pass: the swap lattice is never stored,
+       the exercise decision max(continuation, flag*swap) is taken on
+       whole time slices '''
+
+    def __init__(self, swaption_pars, keep=None, path=None):
+        self.parameters = swaption_pars
+        self.exercised  = None # states exercised, per period
+        super().__init__(self.parameters.nperiods, keep, path)
+        self.size -= 1 # arrears
+
+
+    def build(self, ts_pars, sh_rate=None):
+        '''Build the swaption lattice'''
+        if sh_rate is None: # shared curve
+            sh_rate = sr.REGISTRY.short_rate(ts_pars)
+        par       = self.parameters
+        exercise  = np.zeros(self.size+1, dtype=bool)
+        exercise[par.exercise] = True
+        self.exercised = np.zeros(self.size+1, dtype=int)
+        values = np.zeros((2, self.size+2)) # swap, swaption at t+1
+        for period in range(self.size, -1, -1):
+            rates  = sh_rate.time_slice(period)
+            values = self._back_prop_slice(values, ts_pars.rnp)
+            values[0] += rates - par.rate # payment fixed at t
+            values /= 1.0 + rates
+            if exercise[period]:
+                ex_val = par.flag * values[0]
+                exercised = ex_val > values[1]
+                values[1, exercised] = ex_val[exercised]
+                self.exercised[period] = np.count_nonzero(exercised)
+            self._store_slice(period, values[1])
+
+
+    def describe(self):
+        '''Self-descriptor'''
+        super().describe('Bermudan swaption', self.parameters, True)
+
+
 ### ELEMENTARY PRICES ###
 class ElementaryPriceParameters(lt.Parameters):
     '''Encapsulates parameters for elementary prices'''
@@ -254,73 +442,102 @@ class ElementaryPriceParameters(lt.Parameters):
 
 
 class ElementaryPrices(lt.Lattice):
-    '''Elementary price lattice '''
+    '''Elementary price lattice
+       built once per short-rate lattice by vectorized forward induction;
+       any portfolio of cash flows is then priced as a dot product
+       against it instead of a backward pass per instrument '''
 
-    def __init__(self, elem_params):
+    def __init__(self, elem_params, path=None):
         self.parameters = elem_params
         self.built      = False
-        super().__init__(elem_params.nperiods)
-        self.price = [0. for x in range(self.size+1)]
-        self.rates = [0. for x in range(self.size+1)]
+        super().__init__(elem_params.nperiods, path=path)
+        self.price = np.zeros(self.size+1)
+        self.rates = np.zeros(self.size+1)
+        self.zcb   = np.zeros(self.size+1) # unit ZCB prices, filled by build()
 
 
-    def build(self, ts_pars, sh_rate):
+    def build(self, ts_pars, sh_rate=None):
         '''Build the elementary price lattice'''
-        self.lattice[0][0] = 1.0
+        if sh_rate is None: # shared curve
+            sh_rate = sr.REGISTRY.short_rate(ts_pars)
+        prices = np.ones(1)
+        self._store_slice(0, prices)
+        self.zcb[0] = 1.0
         for period in range(1, self.size+1):
-            for state in range(0, period+1):
-                print(state, period)
-                if state == 0:
-                    num    = ts_pars.rnp[0] * self.lattice[state][period-1]
-                    denom = 1. + sh_rate.lattice[state][period-1]
-                    self.lattice[state][period] = num / denom
-                elif state == period:
-                    num   = ts_pars.rnp[0] * self.lattice[state-1][period-1]
-                    denom = 1. + sh_rate.lattice[state-1][period-1]
-                    self.lattice[state][period] = num / denom
-                else:
-                    num1   = ts_pars.rnp[0] * self.lattice[state-1][period-1]
-                    denom1 = 1.0 + sh_rate.lattice[state-1][period-1]
-                    num2   = ts_pars.rnp[1] * self.lattice[state][period-1]
-                    denom2 = 1. + sh_rate.lattice[state][period-1]
-                    self.lattice[state][period] = num1/denom1 + num2/denom2
+            prices = self._forward_prop_slice(prices, sh_rate.time_slice(period-1), ts_pars.rnp)
+            self._store_slice(period, prices)
+            self.zcb[period] = prices.sum()
         self.built = True
 
 
+    def _check_built(self, method):
+        if not self.built:
+            raise Exception(f'build() should be called before {method}()')
+
+
+    def zcb_prices(self):
+        ''' prices of the unit ZCBs maturing at t=0..size: sums of the time slices '''
+        self._check_built('zcb_prices')
+        return self.zcb
+
+
+    def price_cash_flows(self, cash_flows):
+        ''' prices time-dependent cash flows, cash_flows[..., t] paid at t
+            a (K x T) array prices K instruments in one reduction '''
+        cash_flows = np.asarray(cash_flows, dtype=float)
+        periods    = cash_flows.shape[-1]
+        if periods > self.size+1:
+            raise Exception(f'Cash flows up to t={periods-1} beyond lattice ({self.size})')
+        return cash_flows @ self.zcb_prices()[:periods]
+
+
+    def price_state_cash_flows(self, cash_flows):
+        ''' prices state-dependent cash flows, cash_flows[..., state, t]
+            laid out like the lattice (only states <= t are used) '''
+        self._check_built('price_state_cash_flows')
+        cash_flows = np.asarray(cash_flows, dtype=float)
+        states, periods = cash_flows.shape[-2:]
+        return np.einsum('...ij,ij->...', cash_flows, self.lattice[:states, :periods])
+
+
+    @staticmethod
+    def bond_cash_flows(face, coupon, nperiods):
+        ''' cash flows of bonds.Bond: coupons at t=0..n-1, face + coupon at n '''
+        cash_flows = np.full(nperiods+1, face*coupon)
+        cash_flows[-1] += face
+        return cash_flows
+
+
     def discount(self):
         '''Compute ZCB prices'''
+        self._check_built('discount')
         print('\n  | coupon| spot|')
         print('P | price | rate|')
         print('-----------------')
-        if self.built:
-            for period in range(1, self.size+1):
-                for state in range(0, period+1):
-                    self.price[period] += self.lattice[state][period]
-                self.price[period] *= self.parameters.base
-                base = self.parameters.base/self.price[period]
-                exp  = 1.0/period
-                self.rates[period] = pow(base, exp) - 1.0
-                print(f'{period} | {self.price[period]:3.2f} | {self.rates[period]:5.2%}')
-        else:
-            raise Exception('build() should be called before discount()')
+        periods = np.arange(1, self.size+1)
+        self.price[1:] = self.zcb_prices()[1:] * self.parameters.base
+        self.rates[1:] = (self.parameters.base/self.price[1:])**(1.0/periods) - 1.0
+        for period in periods:
+            print(f'{period} | {self.price[period]:3.2f} | {self.rates[period]:5.2%}')
 
 
     def describe(self):
         '''Self-descriptor'''
-        super().describe('Elementary', None, False)
+        super().describe('Elementary', self.parameters, False)
 
 
 #### Driver ####
 if __name__ == '__main__':
     ## Derivative selection ##
-    # Set either of caplet, floorlet, swap, swaption, elementary
+    # Set either of caplet, floorlet, cap, floor, swap, swaption, bermudan,
+    # elementary, calibration
     DERIVATIVE   = 'zcb'
     LATTICE_FLAG = True # print lattice to stdout
     DERIVATIVE   = str.lower(DERIVATIVE)
 
     # Load underlying security-related parameters
     term_params = TermStructureParameters()
-    short_rates = ShortRate(term_params)
+    short_rates = sr.REGISTRY.short_rate(term_params)
     short_rates.display_lattice('Short-rate', True)
 
 
@@ -333,6 +550,14 @@ if __name__ == '__main__':
             cflet.display_lattice(str.capitalize(DERIVATIVE), True)
         cflet.describe()
 
+    # Caps & floors: strips of caplets/floorlets for every strike at once
+    elif DERIVATIVE in ('cap', 'floor'):
+        cap_params = CapFloorParameters(DERIVATIVE, CF_NPER, CAP_STRIKES)
+        capfloor   = CapFloor(cap_params)
+        capfloor.build(term_params, short_rates)
+        cap_params.describe()
+        capfloor.describe()
+
     # Swaps & swaptions
     elif DERIVATIVE in ('swap', 'swaption'):
         swap = Swap(SwapParameters(SWAP_NPER, FIXED_RATE))
@@ -347,6 +572,15 @@ if __name__ == '__main__':
                 swaption.display_lattice('Swaption', True)
             swaption.describe()
 
+    # Bermudan swaptions, exercisable at BERMUDAN_EXERCISE
+    elif DERIVATIVE == 'bermudan':
+        bermudan = BermudanSwaption(BermudanSwaptionParameters(SWAP_NPER, FIXED_RATE,
+                                                               BERMUDAN_EXERCISE))
+        bermudan.build(term_params, short_rates)
+        if LATTICE_FLAG:
+            bermudan.display_lattice('Bermudan swaption', True)
+        bermudan.describe()
+
     # Elementary prices
     elif DERIVATIVE == 'elementary':
         elementary = ElementaryPrices(ElementaryPriceParameters(ELEM_NPER, ELEM_BASE_PRICE))
@@ -356,6 +590,17 @@ if __name__ == '__main__':
         elementary.describe()
         elementary.discount()
 
+    # Short-rate lattice calibrated to CAL_SPOT_RATES
+    elif DERIVATIVE == 'calibration':
+        calibrated = CalibratedShortRate(CalibrationParameters(CAL_SPOT_RATES, CAL_VOLAT,
+                                                               CAL_MODEL))
+        if LATTICE_FLAG:
+            calibrated.display_lattice('Calibrated short-rate', True)
+        calibrated.describe()
+        elementary = ElementaryPrices(ElementaryPriceParameters(calibrated.size+1,
+                                                                ELEM_BASE_PRICE))
+        elementary.build(calibrated.parameters, calibrated)
+        elementary.discount()
 
     else:
         raise Exception(f'Non-existent DERIVATIVE value: "{DERIVATIVE}"')
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 20:55:12 2026
+
+Trinomial lattices for shares, options & futures
+
+Each node moves up (u), stays (m=1) or moves down (d=1/u):
+    u = exp(STRETCH * sigma * sqrt(dt))
+    p_m = 1 - 1/STRETCH^2
+    p_u & p_d = 1/STRETCH^2 - p_u match the risk-neutral drift exactly:
+    p_u*u + p_m + p_d*d = exp((r-c)dt)
+State j of period t (j=0..2t) holds S0 * u^(j-t). Options & futures
+reuse the binomial pricers of options.py on a three-branch lattice.
+
+@author: charles mégnin
+"""
+import math
+import numpy as np
+import lattice as lt
+import options as op
+import black_scholes as bs
+
+#### PARAMETERS ####
+STRETCH = math.sqrt(3.) # u = exp(STRETCH * sigma * sqrt(dt)), p_m = 1 - 1/STRETCH^2
+#### END PARAMETERS ####
+
+
+class TrinomialParameters(op.SecurityParameters):
+    ''' Security parameters with the up/middle/down rates & probabilities
+        of the trinomial lattice: r_ud=[u, 1, d] & rnp=[p_u, p_m, p_d] '''
+
+    def _set_up_down_rates(self):
+        ''' u = exp(STRETCH * sigma * sqrt(dt)), m = 1, d = 1/u '''
+        u_rate    = math.exp(STRETCH * self.volat * math.sqrt(self.matur / self.nperiods))
+        self.r_ud = [u_rate, 1.0, 1.0 / u_rate]
+
+
+    def _set_risk_neutral_proba(self):
+        ''' p_m fixed by STRETCH, p_u & p_d match the drift exp((r-c)dt) '''
+        growth  = math.exp((self.rate - self.dividend) * self.matur / self.nperiods)
+        outer   = 1.0 / STRETCH**2 # p_u + p_d
+        u_rate, _, d_rate = self.r_ud
+        p_up    = (growth - 1.0 - outer * (d_rate - 1.0)) / (u_rate - d_rate)
+        self.rnp = [p_up, 1.0 - outer, outer - p_up]
+        if min(self.rnp) < 0.:
+            raise Exception(f'Negative trinomial probabilities {self.rnp}: increase nperiods')
+
+
+    def describe(self):
+        ''' Prints summary parameters to stdout '''
+        print('*** Trinomial security parameters ***')
+        print(f'Initial price: {self.init}')
+        print(f'Risk-free rate: {100*self.rate:.2f}%')
+        print(f'Dividend yield: {100*self.dividend:.2f}%')
+        print(f'Volatility: {100*self.volat:.2f}%')
+        print(f'u = {self.r_ud[0]:.5f} / m = 1 / d = {self.r_ud[2]:.5f}')
+        print(f'p_u = {self.rnp[0]:.5f} / p_m = {self.rnp[1]:.5f} / p_d = {self.rnp[2]:.5f}')
+        lt.Parameters.describe(self)
+
+
+
+class TrinomialLattice(lt.Lattice):
+    ''' Three-branch lattice: 2t+1 states at period t '''
+    branches = 3
+
+    @staticmethod
+    def _back_prop_slice(values, rnp):
+        ''' vectorized three-branch back-propagation over a time slice
+            returns p_u*V^(i+2)_(t+1) + p_m*V^(i+1)_(t+1) + p_d*V^i_(t+1) '''
+        return values[..., 2:] * rnp[0] + values[..., 1:-1] * rnp[1] + values[..., :-2] * rnp[2]
+
+
+
+class TrinomialShares(TrinomialLattice):
+    ''' Trinomial shares lattice: S0 * u^(state-period)
+        lazy=True evaluates the nodes on demand instead of storing them '''
+
+    def __init__(self, sec_par, lazy=False, path=None):
+        self.sec_parameters = sec_par
+        self.init = sec_par.init
+        self.r_ud = sec_par.r_ud
+        self.lazy = lazy
+        super().__init__(sec_par.nperiods, 0 if lazy else None, None if lazy else path)
+        if lazy: # S0 * u^k for k=-size..size, shared by all slices
+            self._u_pow = self.init * np.power(self.r_ud[0], np.arange(-self.size, self.size+1.))
+
+
+    def build(self):
+        ''' stores the lattice slice by slice: S_t = [d*S^0_(t-1), S_(t-1), u*S^last_(t-1)]
+            nothing to do in lazy mode '''
+        if self.lazy:
+            return
+        values = np.array([self.init], dtype=float)
+        self._store_slice(0, values)
+        for period in range(1, self.size+1):
+            values = np.concatenate(([self.r_ud[2] * values[0]], values,
+                                     [self.r_ud[0] * values[-1]]))
+            self._store_slice(period, values)
+
+
+    def node_count(self):
+        ''' nothing is computed by a lazy build '''
+        return 0 if self.lazy else super().node_count()
+
+
+    def time_slice(self, period):
+        ''' returns states 0..2*period at time period '''
+        if not self.lazy:
+            return super().time_slice(period)
+        return self._u_pow[self.size-period:self.size+period+1]
+
+
+    def node(self, state, period):
+        ''' returns a single node '''
+        if not self.lazy:
+            return self.lattice[state][period]
+        return self.init * self.r_ud[0]**(state-period)
+
+
+
+class TrinomialOptions(TrinomialLattice, op.Options):
+    ''' European & american options on a trinomial shares or futures lattice
+        (build & exercise boundary of options.Options)
+        smooth=True prices the last period over one step instead of the
+        kinked payoff: Black-Scholes-Merton on shares, Black-76 on futures '''
+
+    def __init__(self, opt_par, keep=None, path=None, smooth=True):
+        self.smooth = smooth
+        super().__init__(opt_par, keep, path)
+
+
+    def _final_values(self, underlying, sec_par):
+        ''' stores the payoff at maturity and, if smooth, the one-step
+            Black-Scholes-Merton (shares) or Black-76 (futures) values at
+            size-1 (floored by exercise for american options);
+            returns where the induction starts '''
+        last, values = super()._final_values(underlying, sec_par)
+        if not self.smooth or self.size < 1:
+            return last, values
+        period  = self.size - 1
+        spot    = underlying.time_slice(period)
+        strike  = self.option_parameters.strike
+        # futures have no carry: Black-76 is Black-Scholes-Merton with dividend = rate
+        carry   = sec_par.rate if isinstance(underlying, op.Futures) else sec_par.dividend
+        one_step = op.SecurityParametersBatch(spot, sec_par.matur / self.size, sec_par.volat, 1,
+                                              sec_par.rate, carry)
+        values  = bs.BlackScholes(one_step, op.OptionParameters(self.option_parameters.opt,
+                                                                'european', strike, 1)).build()
+        if self.flags[1] == 'A':
+            ex_val = self.flags[0]*(spot - strike)
+            self._set_boundary(period, spot, ex_val > values)
+            values = np.maximum(ex_val, values)
+        self._store_slice(period, values)
+        return period, values
+
+
+    def _american_step(self, values, spot, strike, rnp, denom):
+        ''' three-branch step in NumPy (the kernels are binomial) '''
+        # pylint: disable=too-many-arguments
+        ratio  = self._back_prop_slice(values, rnp) / denom
+        ex_val = self.flags[0]*(spot - strike)
+        return np.maximum(ex_val, ratio), ex_val > ratio
+
+
+
+class TrinomialFutures(TrinomialLattice, op.Futures):
+    ''' Futures on a trinomial shares lattice (build of options.Futures) '''
+
+
+
+def richardson_price(opt_par, sec_par):
+    ''' smoothed trinomial option price extrapolated from N & N/2 periods:
+        2*C(N) - C(N/2), N = sec_par.nperiods (options expire at N) '''
+    prices = []
+    for nperiods in (sec_par.nperiods, sec_par.nperiods // 2):
+        security_params = TrinomialParameters(sec_par.init, sec_par.matur, sec_par.volat,
+                                              nperiods, sec_par.rate, sec_par.dividend)
+        options = TrinomialOptions(op.OptionParameters(opt_par.opt, opt_par.type,
+                                                       opt_par.strike, nperiods), keep=1)
+        options.build(TrinomialShares(security_params, lazy=True), security_params)
+        prices.append(options.present_value())
+    return 2. * prices[0] - prices[1]
+
+
+
+if __name__ == '__main__':
+    # european: error vs Black-Scholes-Merton
+    print(f'{"N":>5s} {"binomial":>12s} {"trinomial":>12s} {"richardson":>12s}')
+    for nperiods in (20, 40, 80, 160, 320):
+        errors = []
+        for params, shares_class, options_class in (
+                (op.SecurityParameters, op.Shares, op.Options),
+                (TrinomialParameters, TrinomialShares, TrinomialOptions)):
+            security_params = params(nperiods=nperiods)
+            option_params   = op.OptionParameters(op.OPT, 'european', op.K, nperiods)
+            options = options_class(option_params, keep=1)
+            options.build(shares_class(security_params, lazy=True), security_params)
+            errors.append(options.present_value())
+        analytic = bs.BlackScholes(security_params, option_params).build()
+        errors.append(richardson_price(option_params, security_params))
+        print(f'{nperiods:5d} ' + ' '.join(f'{error - analytic:12.2e}' for error in errors))
+
+    security_params = TrinomialParameters()
+    shares = TrinomialShares(security_params)
+    shares.build()
+    futures = TrinomialFutures(security_params)
+    futures.build(shares)
+
+    option_params = op.OptionParameters(op.OPT, 'american', op.K, op.OP_NPER)
+    american = TrinomialOptions(option_params)
+    american.build(shares, security_params)
+
+    security_params.describe()
+    print(f'Futures: F0={futures.present_value():.2f}')
+    american.describe('Trinomial option', option_params, False)
+    print(f'Richardson: C0={richardson_price(option_params, security_params):.4f}')